@@ -1,14 +1,18 @@
 import os
-import re
+import asyncio
 import chainlit as cl
 from pathlib import Path
 from loguru import logger
 import os
 print(os.getcwd())
-from hub import Pipeline
-from utils import methods
+from hub import Pipeline, astream_response
+from router import Intent
 
 
+# Failure answers are recognisable from their opening sentence, the check deciding the citations starts once it has
+# been streamed. Whether the answer is cached is decided on the whole answer, as in app_streamlit.py.
+FAILURE_CHECK_PREFIX_LENGTH = 200
+
 # ---- ---- ---- ----
 # -- AUTH START
 # ---- ---- ---- ----
@@ -18,8 +22,9 @@ def auth_callback(username: str, password: str):
     # Fetch the user matching username from your database
     # and compare the hashed password with the value stored in the database
     if (username, password) == ("chatbotuser", "Ch@tBot124!"):
+        # The login name identifies the user, their category is resolved from it on chat start
         return cl.User(
-            identifier="admin", metadata={"role": "admin", "provider": "credentials"}
+            identifier=username, metadata={"role": "admin", "provider": "credentials"}
         )
     else:
         return None
@@ -36,6 +41,8 @@ def create_pipeline():
     pipeline.connect_client(secrets_directory=path_to_secrets)
     pipeline.prepare_settings()
     pipeline.prepare_embeddings(parser_type="llamacloud")
+    pipeline.load_embeddings()
+    pipeline.prepare_catalog()
     logger.info("[CACHE INIT] Pipeline creation process completed.")
     return pipeline
 
@@ -48,8 +55,12 @@ glob_pipeline = create_pipeline()
 @cl.on_chat_start
 async def factory():
     logger.info("[CHAT ACTIVATION] Chat session initiated.")
-    engine = glob_pipeline.spawn_query_engine(index_identifier="zahid-index")
+    # Sessions of the same category share its pooled engine and cached answers
+    user = cl.user_session.get("user")
+    category = glob_pipeline.resolve_user_category(user.identifier if user is not None else "")
+    engine = glob_pipeline.spawn_category_engine(category)
     cl.user_session.set("engine", engine)
+    cl.user_session.set("index_identifier", glob_pipeline.answer_scope(category))
     await cl.Message(
         author="Assistant", content="Hello! How can I assist you today?", elements=[],
     ).send()
@@ -60,26 +71,21 @@ async def factory():
 
 @cl.on_message
 async def process_message(message: cl.Message):
-    # Check if the message content is a greeting
-    greetings = ["hello", "hi", "greetings", "hey"]
-    if any(greeting in message.content.lower() for greeting in greetings) and len(message.content) < 10:
+    # The message is embedded once for the router, the answer cache and the retriever
+    context = glob_pipeline.new_request(message.content)
+    decision = await glob_pipeline.aroute_message(message.content, context=context)
+    if decision.intent == Intent.GREETING:
         # If it's a greeting, send a simple message without elements
         await cl.Message(content="Hi! What would you like to ask me about?", elements=[]).send()
         return
 
-    is_general = glob_pipeline.check_if_user_asks_about_general_info(message.content)
-    if is_general:
-        # Recursively scan the directory and prepare elements for each unique file
-        directory_path = "./data/source"
-        file_paths = []
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                if file_path.endswith(".pdf"):  # Assuming you're looking for PDF files
-                    file_paths.append(file_path)
+    if decision.intent == Intent.THANKS:
+        await cl.Message(content="I am glad to help. Let me know if you have any other question.", elements=[]).send()
+        return
 
-        # Ensure all file paths are unique
-        unique_file_paths = list(set(file_paths))
+    if decision.intent == Intent.CATALOG:
+        # The catalog holds every source file, paths are unique
+        unique_file_paths = glob_pipeline.source_catalog.files(suffix=".pdf")
 
         # Use basename for each path in the pdf_links_text
         pdf_links_text = "".join([f"\n{os.path.basename(pdf)}" for pdf in unique_file_paths])
@@ -93,45 +99,61 @@ async def process_message(message: cl.Message):
         await cl.Message(content=final_response).send()
         return
 
-    if len(message.content) < 10:
+    if decision.intent == Intent.TOO_SHORT:
         await cl.Message(content="I'd be happy to assist with your query, but I'll need a bit more information to provide a precise response.\n\
             Could you please provide additional details or clarify your request?", 
             elements=[]).send()
         return
 
     engine = cl.user_session.get("engine")
-    search_results = engine.query(message.content)
-    response_text = search_results.response
-    retrieval_failed = glob_pipeline.check_if_retrieval_failed(response_text)
-    response_elements = []
-    if retrieval_failed:
-        final_response_text = response_text
+    index_identifier = cl.user_session.get("index_identifier")
+    response_message = cl.Message(content="")
+    answer_to_store = None
+    cached_answer = await glob_pipeline.alookup_answer(index_identifier, message.content, context=context)
+    if cached_answer is not None:
+        # Only successful answers are cached
+        citations = glob_pipeline.extract_citations(cached_answer.source_nodes)
+        await response_message.stream_token(cached_answer.text)
+        retrieval_failed = False
     else:
-        try:
-            # Regex pattern to extract 'file_name'
-            file_pattern = r"'file_name': '(.*?)'"
-            file_names_found = re.findall(file_pattern, str(search_results.source_nodes))
-
-            # Remove duplicate file names
-            unique_file_names = list(dict.fromkeys(file_names_found))
-            # Constructing paths for the found source files
-            source_paths = []        
-            for file_name in unique_file_names:
-                source_paths.append(methods.find_file(directory="./data/source", filename=file_name))
-            # Creating PDF elements for the response
-            response_elements = [
-                cl.Pdf(name=file_name, display="side", path=path)
-                for file_name, path in zip(unique_file_names, source_paths)
-            ]
-            # Enhancing the response text with links to the associated PDFs
-            pdf_links_text = "".join([f"\n{pdf}" for pdf in unique_file_names])
-            if response_elements:
-                final_response_text = response_text + f"\n\nSource Documents:{pdf_links_text}\n"
-            else: 
-                final_response_text = response_text
-        except Exception as error:
-            response_elements = []
-            final_response_text = response_text
-            logger.error(f"[ERROR OCCURRED] {error}")
-
-    await cl.Message(content=final_response_text, elements=response_elements).send()
\ No newline at end of file
+        search_results = await engine.aquery(await context.aquery_bundle())
+        source_nodes = search_results.source_nodes
+        # Citations are known before the first token, the failure check runs while the tokens are streamed
+        citations = glob_pipeline.extract_citations(source_nodes)
+        failure_task, checked_text = None, None
+        response_text = ""
+        async for token in astream_response(search_results):
+            response_text += token
+            await response_message.stream_token(token)
+            if source_nodes and failure_task is None and len(response_text) >= FAILURE_CHECK_PREFIX_LENGTH:
+                checked_text = response_text
+                failure_task = asyncio.create_task(glob_pipeline.acheck_if_retrieval_failed(checked_text))
+        if source_nodes and failure_task is None:
+            checked_text = response_text
+            failure_task = asyncio.create_task(glob_pipeline.acheck_if_retrieval_failed(checked_text))
+        # The gated engine answers without any source nodes when retrieval is not confident
+        retrieval_failed = failure_task is None or await failure_task
+        if source_nodes:
+            answer_to_store = (response_text, source_nodes, retrieval_failed if checked_text == response_text else None)
+
+    # Creating PDF elements for the cited files found on disk
+    response_elements = [] if retrieval_failed else [
+        cl.Pdf(name=citation.file_name, display="side", path=citation.file_path)
+        for citation in citations
+        if citation.file_path is not None
+    ]
+    # Enhancing the response text with page-level references to the associated PDFs
+    if response_elements:
+        pdf_links_text = "".join([f"\n{citation.label}" for citation in citations])
+        await response_message.stream_token(f"\n\nSource Documents:{pdf_links_text}\n")
+        response_message.elements = response_elements
+
+    await response_message.send()
+
+    if answer_to_store is not None:
+        # The whole answer is checked once it was sent, unless the check of the citations already covered it
+        response_text, source_nodes, answer_failed = answer_to_store
+        if answer_failed is None:
+            answer_failed = await glob_pipeline.acheck_if_retrieval_failed(response_text)
+        if not answer_failed:
+            await glob_pipeline.astore_answer(index_identifier, message.content, response_text, source_nodes, context=context)
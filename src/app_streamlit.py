@@ -1,10 +1,9 @@
 import os
-import re
 import streamlit as st
 from pathlib import Path
 from loguru import logger
 from hub import Pipeline
-from utils import methods
+from router import Intent
 import uuid
 import time
 import threading
@@ -52,6 +51,7 @@ def create_pipeline():
     pipeline.prepare_settings()
     pipeline.prepare_embeddings(parser_type="llamacloud")
     pipeline.load_embeddings()
+    pipeline.prepare_catalog()
     logger.info("[CACHE INIT] Pipeline creation process completed.")
     return pipeline
 
@@ -71,8 +71,12 @@ def main():
 
     # Initialize engine if not already done
     if 'engine' not in st.session_state:
-        st.session_state.engine = glob_pipeline.spawn_query_engine(index_identifier="zahid-index")
+        # Sessions of the same category share its pooled engine and cached answers
+        category = glob_pipeline.resolve_user_category(username)
+        st.session_state.index_identifier = glob_pipeline.answer_scope(category)
+        st.session_state.engine = glob_pipeline.spawn_category_engine(category)
     engine = st.session_state.engine
+    index_identifier = st.session_state.index_identifier
 
     # Display chat messages and source documents
     for message in st.session_state[username]['messages']:
@@ -89,53 +93,69 @@ def main():
 
         with st.chat_message("assistant"):
             message = prompt
-            greetings = ["hello", "hi", "greetings", "hey"]
-            if any(greeting in message.lower() for greeting in greetings) and len(message) < 10:
+            # The message is embedded once for the router, the answer cache and the retriever
+            context = glob_pipeline.new_request(message)
+            decision = glob_pipeline.route_message(message, context=context)
+            if decision.intent == Intent.GREETING:
                 response_text, source_docs = "Hi! What would you like to ask me about?", None
                 st.markdown(response_text)
-            elif 'thank' in message.lower() and len(message) < 20:
+            elif decision.intent == Intent.THANKS:
                 response_text, source_docs = "I am glad to help. Let me know if you have any other question.", None
                 st.markdown(response_text)
-            elif glob_pipeline.check_if_user_asks_about_general_info(message):
+            elif decision.intent == Intent.CATALOG:
                 response_text, source_docs = display_general_info()
                 st.markdown(response_text)
-            elif len(message) < 10:
+            elif decision.intent == Intent.TOO_SHORT:
                 response_text, source_docs = "I'd be happy to assist with your query, but I'll need a bit more information to provide a precise response. Could you please provide additional details or clarify your request?", None
                 st.markdown(response_text)
             else:
-                search_results = engine.query(message)
-                
-                # Stream the response in the main thread
-                response_placeholder = st.empty()
-                full_response = ""
-                for chunk in search_results.response_gen:
-                    full_response += chunk
-                    response_placeholder.markdown(full_response + "▌")
-                response_placeholder.markdown(full_response)
-
-                response_text = full_response
+                cached_answer = glob_pipeline.lookup_answer(index_identifier, message, context=context)
+                if cached_answer is not None:
+                    # Only successful answers are cached
+                    response_text, source_nodes = cached_answer.text, cached_answer.source_nodes
+                    st.markdown(response_text)
+                    retrieval_failed = False
+                else:
+                    search_results = engine.query(context.query_bundle())
+
+                    # Stream the response in the main thread
+                    response_placeholder = st.empty()
+                    full_response = ""
+                    for chunk in search_results.response_gen:
+                        full_response += chunk
+                        response_placeholder.markdown(full_response + "▌")
+                    response_placeholder.markdown(full_response)
+
+                    response_text, source_nodes = full_response, search_results.source_nodes
+                    retrieval_failed = glob_pipeline.check_if_retrieval_failed(response_text)
+                    if not retrieval_failed:
+                        glob_pipeline.store_answer(index_identifier, message, response_text, source_nodes, context=context)
+
                 source_docs = None
-                if not glob_pipeline.check_if_retrieval_failed(response_text):
-                    try:
-                        file_pattern = r"'file_name': '(.*?)'"
-                        file_names_found = re.findall(file_pattern, str(search_results.source_nodes))
-                        unique_file_names = list(dict.fromkeys(file_names_found))
-                        source_paths = []        
-                        for file_name in unique_file_names:
-                            source_paths.append(methods.find_file(directory="./data/source", filename=file_name))
-
-                        source_docs = list(zip(unique_file_names, source_paths)) if unique_file_names else None
+                if not retrieval_failed:
+                    citations = [citation for citation in glob_pipeline.extract_citations(source_nodes) if citation.file_path is not None]
+                    if citations:
+                        pages_text = "".join([f"\n- {citation.label}" for citation in citations])
+                        st.markdown(f"Source Documents:{pages_text}")
+                        response_text += f"\n\nSource Documents:{pages_text}"
+                        source_docs = [(citation.file_name, citation.file_path) for citation in citations]
                         display_source_documents(source_docs)
                         st.session_state[username]['source_docs'] = source_docs
-                    except Exception as error:
-                        logger.error(f"[ERROR OCCURRED] {error}")
-                        
+
         st.session_state[username]['messages'].append({"role": "assistant", "content": response_text, "source_docs": source_docs})
 
+    answer_cache_stats = glob_pipeline.answer_cache_stats()
+    if answer_cache_stats:
+        st.sidebar.caption(
+            f"Answer cache: {answer_cache_stats['hit_rate']:.0%} hit rate, {answer_cache_stats['entries']} answers"
+        )
+
     # Logout button
     if st.sidebar.button("Logout"):
         st.session_state['logged_in'] = False
         st.session_state['username'] = None
+        # The next user may belong to another category
+        st.session_state.pop('engine', None)
         st.rerun()
 
 # def main():
@@ -290,15 +310,7 @@ def display_source_documents(source_docs):
 #             return response_text, None
 
 def display_general_info():
-    directory_path = "./data/source"
-    file_paths = []
-    for root, dirs, files in os.walk(directory_path):
-        for file in files:
-            file_path = os.path.join(root, file)
-            if file_path.endswith(".pdf"):
-                file_paths.append(file_path)
-
-    unique_file_paths = list(set(file_paths))
+    unique_file_paths = glob_pipeline.source_catalog.files(suffix=".pdf")
     pdf_links_text = "".join([f"\n- {os.path.basename(pdf)}" for pdf in unique_file_paths])
     response_text = (
         "I'm here to help answering about Zahid Group Policies and Procedures.\n\n"
@@ -0,0 +1,4 @@
+from .store import DiskStore
+from .embedding import CachedEmbedding
+from .answer import AnswerCache, CachedAnswer
+from .extractor import CachedExtractor
@@ -0,0 +1,209 @@
+import re
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from loguru import logger
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import NodeWithScore
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    text: str
+    source_nodes: List[NodeWithScore]
+    embedding: np.ndarray
+    created: float = field(default_factory=time.time)
+    similarity: float = 1.0
+
+
+class _IndexAnswers:
+    """ Answers of a single index, in least-recently-used order. """
+
+    def __init__(self) -> None:
+        self.entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._keys: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def matrix(self):
+        if self._matrix is None and self.entries:
+            self._keys = list(self.entries.keys())
+            self._matrix = np.stack([self.entries[key].embedding for key in self._keys])
+        return self._keys, self._matrix
+
+    def touch(self) -> None:
+        self._matrix = None
+
+
+class AnswerCache:
+    """
+    Semantic cache of synthesized answers, kept separately for every index.
+
+    A question is first looked up by its normalized text, then by the nearest cached question
+    embedding above `similarity_threshold`. Entries expire after `ttl` seconds and the least
+    recently used ones are evicted beyond `max_entries` per index.
+    """
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        similarity_threshold: Optional[float] = 0.95,
+        ttl: Optional[float] = 24 * 3600,
+        max_entries: Optional[int] = 1000,
+    ) -> None:
+        """
+        Initializes the AnswerCache object.
+
+        Args:
+            embed_model (BaseEmbedding): The model used to embed the questions.
+            similarity_threshold (float, optional): Minimum cosine similarity of a semantic hit. Defaults to 0.95.
+            ttl (float, optional): Lifetime of an answer in seconds. Defaults to one day.
+            max_entries (int, optional): The maximum number of answers per index. Defaults to 1000.
+
+        Returns:
+            None
+        """
+        self._embed_model = embed_model
+        self._similarity_threshold = similarity_threshold
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._indexes: Dict[str, _IndexAnswers] = {}
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def lookup(self, index_name: str, question: str, embedding: Optional[List[float]] = None) -> Optional[CachedAnswer]:
+        """
+        Looks up a cached answer for the question.
+
+        Args:
+            index_name (str): The index the question is asked against.
+            question (str): The question of the user.
+            embedding (List[float], optional): The query embedding, computed if not provided.
+
+        Returns:
+            Optional[CachedAnswer]: The cached answer, None on a miss.
+        """
+        answers, entry = self._lookup_exact(index_name, question)
+        if entry is not None or answers is None:
+            return entry
+        if embedding is None:
+            embedding = self._embed_model.get_query_embedding(question)
+        return self._lookup_nearest(answers, question, embedding)
+
+    async def alookup(self, index_name: str, question: str, embedding: Optional[List[float]] = None) -> Optional[CachedAnswer]:
+        answers, entry = self._lookup_exact(index_name, question)
+        if entry is not None or answers is None:
+            return entry
+        if embedding is None:
+            embedding = await self._embed_model.aget_query_embedding(question)
+        return self._lookup_nearest(answers, question, embedding)
+
+    def store(self, index_name: str, question: str, text: str, source_nodes: List[NodeWithScore], embedding: Optional[List[float]] = None) -> None:
+        if embedding is None:
+            embedding = self._embed_model.get_query_embedding(question)
+        self._store(index_name, question, text, source_nodes, embedding)
+
+    async def astore(self, index_name: str, question: str, text: str, source_nodes: List[NodeWithScore], embedding: Optional[List[float]] = None) -> None:
+        if embedding is None:
+            embedding = await self._embed_model.aget_query_embedding(question)
+        self._store(index_name, question, text, source_nodes, embedding)
+
+    def invalidate(self, index_name: Optional[str] = None) -> None:
+        """
+        Drops the answers of the index, or of every index when no name is given.
+        """
+        with self._lock:
+            if index_name is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(index_name, None)
+        logger.info(f"[ANSWER CACHE] Invalidated answers of {index_name or 'all indexes'}.")
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.exact_hits + self.semantic_hits
+        requests = hits + self.misses
+        return {
+            "entries": sum(len(answers.entries) for answers in self._indexes.values()),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / requests if requests else 0.0,
+        }
+
+    def _lookup_exact(self, index_name: str, question: str):
+        """
+        Returns the answers of the index (None if there is nothing to search) and the exact hit, if any.
+        """
+        key = normalize_question(question)
+        with self._lock:
+            answers = self._indexes.get(index_name, None)
+            if answers is not None:
+                self._expire(answers)
+                entry = answers.entries.get(key, None)
+                if entry is not None:
+                    answers.entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return answers, entry
+            if answers is None or not answers.entries:
+                self.misses += 1
+                return None, None
+            return answers, None
+
+    def _lookup_nearest(self, answers: _IndexAnswers, question: str, embedding: List[float]) -> Optional[CachedAnswer]:
+        query_embedding = _normalize(embedding)
+        with self._lock:
+            keys, matrix = answers.matrix()
+            if matrix is None:
+                self.misses += 1
+                return None
+            similarities = matrix @ query_embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] < self._similarity_threshold or keys[best] not in answers.entries:
+                self.misses += 1
+                return None
+            answers.entries.move_to_end(keys[best])
+            self.semantic_hits += 1
+            entry = answers.entries[keys[best]]
+            logger.info(f"[ANSWER CACHE] Semantic hit for '{question}' on '{entry.question}' ({similarities[best]:.3f}).")
+            return CachedAnswer(
+                question=entry.question,
+                text=entry.text,
+                source_nodes=entry.source_nodes,
+                embedding=entry.embedding,
+                created=entry.created,
+                similarity=float(similarities[best]),
+            )
+
+    def _store(self, index_name: str, question: str, text: str, source_nodes: List[NodeWithScore], embedding: List[float]) -> None:
+        with self._lock:
+            answers = self._indexes.setdefault(index_name, _IndexAnswers())
+            answers.entries[normalize_question(question)] = CachedAnswer(
+                question=question, text=text, source_nodes=list(source_nodes), embedding=_normalize(embedding),
+            )
+            while len(answers.entries) > self._max_entries:
+                answers.entries.popitem(last=False)
+            answers.touch()
+
+    def _expire(self, answers: _IndexAnswers) -> None:
+        deadline = time.time() - self._ttl
+        expired = [key for key, entry in answers.entries.items() if entry.created < deadline]
+        for key in expired:
+            del answers.entries[key]
+        if expired:
+            answers.touch()
+
+
+def normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", question.lower())).strip()
+
+
+def _normalize(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
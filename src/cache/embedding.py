@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import numpy as np
+from typing import Any, Dict, List
+from loguru import logger
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from .store import DiskStore
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Embedding model wrapper which serves repeated texts from a DiskStore.
+
+    Vectors are keyed by the vendor, the model prefix, the kind of the embedding (query or text)
+    and the sha256 of the text, and stored as float32 arrays. Only cache misses reach the wrapped model.
+    With `offload_async` the async methods run the synchronous ones in a worker thread, for models
+    whose async methods would otherwise block the event loop.
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _store: DiskStore = PrivateAttr()
+    _namespace: str = PrivateAttr()
+    _offload_async: bool = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, store: DiskStore, vendor: str, model_prefix: str, offload_async: bool = False, **kwargs: Any) -> None:
+        """
+        Initializes the CachedEmbedding object.
+
+        Args:
+            embed_model (BaseEmbedding): The embedding model returned by the client connector.
+            store (DiskStore): The store holding the cached vectors.
+            vendor (str): The vendor of the embedding model, e.g. "vertex".
+            model_prefix (str): The model prefix from the client configuration.
+            offload_async (bool, optional): Run async calls in a worker thread. Defaults to False.
+
+        Returns:
+            None
+        """
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            callback_manager=embed_model.callback_manager,
+            **kwargs,
+        )
+        self._embed_model = embed_model
+        self._store = store
+        self._namespace = f"{vendor}:{model_prefix}"
+        self._offload_async = offload_async
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    def stats(self) -> Dict[str, float]:
+        return self._store.stats()
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        key = self._key("query", query)
+        cached = self._store.get(key)
+        if cached is not None:
+            return _decode(cached)
+        embedding = self._embed_model._get_query_embedding(query)
+        self._store.put(key, _encode(embedding))
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        if self._offload_async:
+            return await asyncio.to_thread(self._get_query_embedding, query)
+        key = self._key("query", query)
+        cached = self._store.get(key)
+        if cached is not None:
+            return _decode(cached)
+        embedding = await self._embed_model._aget_query_embedding(query)
+        self._store.put(key, _encode(embedding))
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        keys, cached, missing = self._lookup(texts)
+        if missing:
+            embeddings = self._embed_model._get_text_embeddings([texts[i] for i in missing])
+            self._remember(keys, cached, missing, embeddings)
+        return [cached[key] for key in keys]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        if self._offload_async:
+            return await asyncio.to_thread(self._get_text_embeddings, texts)
+        keys, cached, missing = self._lookup(texts)
+        if missing:
+            embeddings = await self._embed_model._aget_text_embeddings([texts[i] for i in missing])
+            self._remember(keys, cached, missing, embeddings)
+        return [cached[key] for key in keys]
+
+    def _key(self, kind: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self._namespace}:{kind}:{digest}"
+
+    def _lookup(self, texts: List[str]):
+        keys = [self._key("text", text) for text in texts]
+        cached = {key: _decode(value) for key, value in self._store.get_many(keys).items()}
+        # Duplicates inside one batch are embedded once.
+        missing = list({key: i for i, key in enumerate(keys) if key not in cached}.values())
+        logger.debug(f"[EMBED CACHE] {sum(key in cached for key in keys)}/{len(texts)} texts served from cache.")
+        return keys, cached, missing
+
+    def _remember(self, keys: List[str], cached: Dict[str, Embedding], missing: List[int], embeddings: List[Embedding]) -> None:
+        items = []
+        for i, embedding in zip(missing, embeddings):
+            cached[keys[i]] = embedding
+            items.append((keys[i], _encode(embedding)))
+        self._store.put_many(items)
+
+
+def _encode(embedding: Embedding) -> bytes:
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def _decode(value: bytes) -> Embedding:
+    return np.frombuffer(value, dtype=np.float32).tolist()
@@ -0,0 +1,183 @@
+import json
+import time
+import hashlib
+from typing import Any, Dict, List, Sequence
+from loguru import logger
+
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.extractors import BaseExtractor, SummaryExtractor, TitleExtractor
+from llama_index.core.schema import BaseNode
+
+from .store import DiskStore
+
+# Fields which change how the extractor runs, not what it extracts.
+_RUNTIME_FIELDS = {"llm", "callback_manager", "show_progress", "num_workers", "in_place"}
+
+
+class CachedExtractor(BaseExtractor):
+    """
+    Metadata extractor wrapper which replays the extracted metadata from a DiskStore.
+
+    Entries are content addressed: the key is the sha256 of the extractor type, its parameters,
+    the identity of the LLM and the node content the extractor reads. Extractors looking beyond a
+    single node are keyed by their whole context, a TitleExtractor by the leading nodes of the
+    document and a SummaryExtractor caches the summary of each node and rebuilds the
+    "prev" and "next" summaries from its neighbours. Only cache misses reach the LLM.
+    """
+
+    extractor: BaseExtractor = Field(description="The wrapped metadata extractor.")
+    _store: DiskStore = PrivateAttr()
+    _namespace: str = PrivateAttr()
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+    _seconds: float = PrivateAttr(default=0.0)
+
+    def __init__(self, extractor: BaseExtractor, store: DiskStore, **kwargs: Any) -> None:
+        """
+        Initializes the CachedExtractor object.
+
+        Args:
+            extractor (BaseExtractor): The metadata extractor to cache.
+            store (DiskStore): The store holding the extracted metadata.
+
+        Returns:
+            None
+        """
+        super().__init__(
+            extractor=extractor,
+            metadata_mode=extractor.metadata_mode,
+            node_text_template=extractor.node_text_template,
+            disable_template_rewrite=extractor.disable_template_rewrite,
+            in_place=extractor.in_place,
+            show_progress=extractor.show_progress,
+            **kwargs,
+        )
+        self._store = store
+        self._namespace = _extractor_namespace(extractor)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedExtractor"
+
+    @property
+    def name(self) -> str:
+        return self.extractor.class_name()
+
+    def stats(self) -> Dict[str, float]:
+        requests = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / requests if requests else 0.0,
+            "seconds": self._seconds,
+        }
+
+    async def aextract(self, nodes: Sequence[BaseNode]) -> List[Dict]:
+        start_time = time.perf_counter()
+        if isinstance(self.extractor, TitleExtractor):
+            metadata_list = await self._aextract_titles(nodes)
+        elif isinstance(self.extractor, SummaryExtractor):
+            metadata_list = await self._aextract_summaries(nodes)
+        else:
+            metadata_list = await self._aextract_nodes(self.extractor, nodes)
+        elapsed = time.perf_counter() - start_time
+        self._seconds += elapsed
+        logger.info(f"[EXTRACTOR CACHE] {self.name}: {self._hits}/{self._hits + self._misses} nodes served from cache, {elapsed:.1f}s spent.")
+        return metadata_list
+
+    # ---- ---- ---- ---- ---- <
+    # > Private Methods
+    # ---- ---- ---- ---- ---- <
+
+    async def _aextract_nodes(self, extractor: BaseExtractor, nodes: Sequence[BaseNode]) -> List[Dict]:
+        keys = [self._key(self._content(node)) for node in nodes]
+        cached = self._lookup(keys)
+        # Duplicated chunks inside one run are extracted once.
+        missing = list({key: i for i, key in enumerate(keys) if key not in cached}.values())
+        if missing:
+            extracted = await extractor.aextract([nodes[i] for i in missing])
+            self._remember({keys[i]: metadata for i, metadata in zip(missing, extracted)}, cached)
+        self._count(hits=len(keys) - len(missing), misses=len(missing))
+        return [dict(cached[key]) for key in keys]
+
+    async def _aextract_titles(self, nodes: Sequence[BaseNode]) -> List[Dict]:
+        extractor = self.extractor
+        nodes_by_doc_id = extractor.separate_nodes_by_ref_id(nodes)
+        keys = {
+            doc_id: self._key("".join(self._content(node) for node in doc_nodes))
+            for doc_id, doc_nodes in nodes_by_doc_id.items()
+        }
+        cached = self._lookup(list(keys.values()))
+        missing = [doc_id for doc_id, key in keys.items() if key not in cached]
+        if missing:
+            titles_by_doc_id = await extractor.extract_titles({doc_id: nodes_by_doc_id[doc_id] for doc_id in missing})
+            self._remember({keys[doc_id]: {"document_title": titles_by_doc_id[doc_id]} for doc_id in missing}, cached)
+        missing = set(missing)
+        missed_nodes = sum(node.ref_doc_id in missing for node in nodes)
+        self._count(hits=len(nodes) - missed_nodes, misses=missed_nodes)
+        return [dict(cached[keys[node.ref_doc_id]]) for node in nodes]
+
+    async def _aextract_summaries(self, nodes: Sequence[BaseNode]) -> List[Dict]:
+        extractor = self.extractor
+        # The summary of a node does not depend on its neighbours, only the node summaries are cached.
+        self_extractor = SummaryExtractor(
+            llm=extractor.llm,
+            summaries=["self"],
+            prompt_template=extractor.prompt_template,
+            metadata_mode=extractor.metadata_mode,
+            num_workers=extractor.num_workers,
+            show_progress=extractor.show_progress,
+        )
+        summaries = [metadata.get("section_summary", None) for metadata in await self._aextract_nodes(self_extractor, nodes)]
+
+        # Mirrors SummaryExtractor.aextract, which pairs neighbours by their position in the batch.
+        metadata_list: List[Dict] = [{} for _ in nodes]
+        for i, metadata in enumerate(metadata_list):
+            if summaries[i] is None:
+                continue
+            if "self" in extractor.summaries:
+                metadata["section_summary"] = summaries[i]
+            if "prev" in extractor.summaries and i > 0 and summaries[i - 1] is not None:
+                metadata["prev_section_summary"] = summaries[i - 1]
+            if "next" in extractor.summaries and i < len(nodes) - 1 and summaries[i + 1] is not None:
+                metadata["next_section_summary"] = summaries[i + 1]
+        return metadata_list
+
+    def _content(self, node: BaseNode) -> str:
+        return node.get_content(metadata_mode=self.extractor.metadata_mode)
+
+    def _key(self, content: str) -> str:
+        return hashlib.sha256(f"{self._namespace}\n{content}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, Dict]:
+        return {key: json.loads(value) for key, value in self._store.get_many(list(set(keys))).items()}
+
+    def _remember(self, extracted: Dict[str, Dict], cached: Dict[str, Dict]) -> None:
+        cached.update(extracted)
+        self._store.put_many([(key, json.dumps(metadata).encode("utf-8")) for key, metadata in extracted.items()])
+
+    def _count(self, hits: int, misses: int) -> None:
+        self._hits += hits
+        self._misses += misses
+
+
+def _extractor_namespace(extractor: BaseExtractor) -> str:
+    """
+    Identifies what an extractor produces: its type, its parameters and the LLM behind it.
+    """
+    parameters = extractor.dict(exclude=_RUNTIME_FIELDS)
+    llm = getattr(extractor, "llm", None)
+    # Rate limiting wrappers do not change what the LLM answers.
+    llm = getattr(llm, "llm", llm)
+    llm_identity = None
+    if llm is not None:
+        llm_identity = {
+            "class_name": llm.class_name(),
+            "model_name": llm.metadata.model_name,
+            "temperature": getattr(llm, "temperature", None),
+        }
+    return json.dumps(
+        {"extractor": extractor.class_name(), "parameters": parameters, "llm": llm_identity},
+        sort_keys=True,
+        default=str,
+    )
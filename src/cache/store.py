@@ -0,0 +1,121 @@
+import time
+import sqlite3
+import threading
+from pathlib import PosixPath, Path
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+
+class DiskStore:
+    """
+    Size-bounded key-value store kept in a single SQLite file.
+
+    Entries are evicted in least-recently-used order once the store grows past `max_entries`.
+    The store is safe to share between threads.
+    """
+
+    def __init__(self, path: PosixPath, max_entries: Optional[int] = None) -> None:
+        """
+        Initializes the DiskStore object.
+
+        Args:
+            path (PosixPath): The path of the SQLite file, parent directories are created if missing.
+            max_entries (int, optional): The maximum number of entries kept in the store. Defaults to unbounded.
+
+        Returns:
+            None
+        """
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self._path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key, None)
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """
+        Fetches the stored values for the given keys, missing keys are absent from the result.
+        """
+        found = {}
+        if not keys:
+            return found
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE entries SET accessed = ? WHERE key = ?", [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, key: str, value: bytes) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items: List[Tuple[str, bytes]]) -> None:
+        if not items:
+            return
+        with self._lock:
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, accessed) VALUES (?, ?, ?)",
+                [(key, value, now) for key, value in items],
+            )
+            self._conn.commit()
+            self._size = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            self._evict()
+
+    def delete_many(self, keys: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+            self._conn.commit()
+            self._size = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._size = 0
+
+    def stats(self) -> Dict[str, float]:
+        requests = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
+
+    def _evict(self) -> None:
+        if self._max_entries is None or self._size <= self._max_entries:
+            return
+        # Evict a tenth below the bound so eviction does not run on every insert.
+        overflow = self._size - int(self._max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed ASC LIMIT ?)", (overflow,)
+        )
+        self._conn.commit()
+        self._size -= overflow
+        logger.info(f"[CACHE] Evicted {overflow} least recently used entries from {self._path}")
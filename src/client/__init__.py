@@ -1 +1,2 @@
-from .conn import ClientConnector, instantiate_client_connector
\ No newline at end of file
+from .conn import ClientConnector, instantiate_client_connector
+from .throttle import ThrottledLLM, TokenBudgetExceeded
@@ -14,7 +14,14 @@ class ClientConnector:
         embed_model: str,
         llm_client: Callable,
         llm: str,
-        pinecone_client: Callable
+        pinecone_client: Optional[Callable],
+        router_client: Optional[Callable] = None,
+        router_model: Optional[str] = None,
+        rerank_vendor: Optional[str] = None,
+        rerank_model: Optional[str] = None,
+        rerank_self_hosted: Optional[bool] = False,
+        metadata_llm_client: Optional[Callable] = None,
+        metadata_llm: Optional[str] = None,
     ) -> None:
         """
         Initialize the ClientConnector class.
@@ -24,12 +31,39 @@ class ClientConnector:
             embed_model (str): The embedding model.
             llm_client (Callable): The LLM client.
             llm (str): The LLM model.
+            router_client (Callable, optional): The client of the intent router embedding model.
+            router_model (str, optional): The intent router embedding model.
+            rerank_vendor (str, optional): The vendor of the rerank model, its client is created on the first load.
+            rerank_model (str, optional): The rerank model.
+            rerank_self_hosted (bool, optional): Whether the rerank model is self-hosted. Defaults to False.
+            metadata_llm_client (Callable, optional): The client of the metadata extraction LLM.
+            metadata_llm (str, optional): The metadata extraction LLM.
         """
         self._embed_client = embed_client
         self._embed_model = embed_model
         self._llm_client = llm_client
         self._llm = llm
         self._pinecone_client = pinecone_client
+        self._router_client = router_client
+        self._router_model = router_model
+        self._rerank_vendor = rerank_vendor
+        self._rerank_model = rerank_model
+        self._rerank_self_hosted = rerank_self_hosted
+        self._rerank_client = None
+        self._metadata_llm_client = metadata_llm_client
+        self._metadata_llm = metadata_llm
+
+    @property
+    def embed_model_supports_async(self) -> bool:
+        """ Whether the async methods of the embedding model are non-blocking. """
+        return getattr(self._embed_client, "supports_async", True)
+
+    @property
+    def router_model_supports_async(self) -> bool:
+        """ Whether the async methods of the router model are non-blocking. """
+        if self._router_client is None:
+            return self.embed_model_supports_async
+        return getattr(self._router_client, "supports_async", True)
 
     def load_embed_model(self):
         """
@@ -55,18 +89,63 @@ class ClientConnector:
         assert llm is not None, "LLM model is missing."
         return llm
 
+    def load_router_model(self):
+        """
+        Load the embedding model dedicated to intent routing.
+
+        Returns:
+            The loaded embedding model, or None if no router model is configured.
+        """
+        if self._router_client is None:
+            return None
+        router_model = self._router_client.load_model(model_category="embedding", model_prefix=self._router_model)
+        assert router_model is not None, "Router model is missing."
+        return router_model
+
+    def load_rerank_model(self, **kwargs):
+        """
+        Load the rerank model, its client is only created here so that a disabled reranker
+        needs neither its dependencies nor its secrets.
+
+        Args:
+            **kwargs: Reranking parameters (top_n, batch_size, backend, cache_size).
+
+        Returns:
+            The loaded node postprocessor, or None if no rerank model is configured.
+        """
+        if self._rerank_vendor is None:
+            return None
+        if self._rerank_client is None:
+            self._rerank_client = _resolve_rerank_client(self._rerank_vendor, self_hosted=self._rerank_self_hosted)
+        rerank_model = self._rerank_client.load_model(model_category="rerank", model_prefix=self._rerank_model, **kwargs)
+        assert rerank_model is not None, "Rerank model is missing."
+        return rerank_model
+
+    def load_metadata_llm(self):
+        """
+        Load the LLM dedicated to metadata extraction during ingestion.
+
+        Returns:
+            The loaded LLM model, or None if no metadata LLM is configured.
+        """
+        if self._metadata_llm_client is None:
+            return None
+        metadata_llm = self._metadata_llm_client.load_model(model_category="llm", model_prefix=self._metadata_llm)
+        assert metadata_llm is not None, "Metadata LLM is missing."
+        return metadata_llm
+
     def load_pinecone_client(self):
         """
         Load the Pinecone client.
 
         Returns:
-            The loaded Pinecone client.
+            The loaded Pinecone client, or None if Pinecone is not connected.
         """
         return self._pinecone_client 
 
 
 def instantiate_client_connector(
-    conf: Config, secrets_dir: Union[bool, PosixPath] = None
+    conf: Config, secrets_dir: Union[bool, PosixPath] = None, connect_pinecone: Optional[bool] = True
 ) -> ClientConnector:
     """
     Instantiate the ClientConnector class.
@@ -74,6 +153,7 @@ def instantiate_client_connector(
     Args:
         conf (Config): The configuration object.
         secrets_dir (Union[bool, PosixPath], optional): The secrets directory. Defaults to None.
+        connect_pinecone (bool, optional): Whether to connect to Pinecone, False with a local vector store. Defaults to True.
 
     Returns:
         The instantiated ClientConnector object.
@@ -106,8 +186,35 @@ def instantiate_client_connector(
     assert llm is not None, "LLM model is missing."
 
     embed_client, llm_client = _resolve_clients(embed_client_conf, llm_client_conf)
-    pinecone_client = PineconeClient()
-    pinecone_client.connect()
+    pinecone_client = None
+    if connect_pinecone:
+        pinecone_client = PineconeClient()
+        pinecone_client.connect()
+
+    # Optional: a cheap (usually local) embedding model for intent routing.
+    router_conf = _conf.get("router_embed", None)
+    router_client, router_model = None, None
+    if router_conf is not None:
+        assert router_conf.client in __KNOWN_VENDORS, f"Router client {router_conf.client} is not supported."
+        router_client = _resolve_embed_client(router_conf.client)
+        router_model = router_conf.prefix
+
+    # Optional: a cross-encoder reranking the retrieved candidates, only Hugging Face models are supported.
+    rerank_conf = _conf.get("rerank_model", None)
+    rerank_vendor, rerank_model, rerank_self_hosted = None, None, False
+    if rerank_conf is not None:
+        assert rerank_conf.client == "huggingface", f"Rerank client {rerank_conf.client} is not supported."
+        rerank_vendor = rerank_conf.client
+        rerank_model = rerank_conf.prefix
+        rerank_self_hosted = rerank_conf.self_hosted
+
+    # Optional: a cheaper LLM for the bulk metadata extraction, keeping the chat LLM free for answers.
+    metadata_llm_conf = _conf.get("metadata_llm", None)
+    metadata_llm_client, metadata_llm = None, None
+    if metadata_llm_conf is not None:
+        assert metadata_llm_conf.client in __KNOWN_VENDORS, f"Metadata LLM client {metadata_llm_conf.client} is not supported."
+        metadata_llm_client = _resolve_llm_client(metadata_llm_conf.client)
+        metadata_llm = metadata_llm_conf.prefix
 
     return ClientConnector(
         embed_client=embed_client,
@@ -115,6 +222,13 @@ def instantiate_client_connector(
         llm_client=llm_client,
         llm=llm,
         pinecone_client=pinecone_client,
+        router_client=router_client,
+        router_model=router_model,
+        rerank_vendor=rerank_vendor,
+        rerank_model=rerank_model,
+        rerank_self_hosted=rerank_self_hosted,
+        metadata_llm_client=metadata_llm_client,
+        metadata_llm=metadata_llm,
     )
 
 
@@ -129,20 +243,21 @@ def _resolve_clients(embed_client_conf: str, llm_client_conf: str):
     Returns:
         The embedding and LLM clients.
     """
-    embed_client = None
-    if embed_client_conf == "huggingface":
-        embed_client = HuggingFaceClient()
-    elif embed_client_conf == "vertex":
-        embed_client = VertexClient()
-    elif embed_client_conf == "azure":
-        embed_client = AzureClient()
-    elif embed_client_conf == "openai":
-        embed_client = OpenAIClient()
-    else:
-        raise ValueError(f"Embedding client {embed_client} is not supported.")
-    assert embed_client is not None, "Embedding client is missing."
-    embed_client.connect()
+    embed_client = _resolve_embed_client(embed_client_conf)
+    llm_client = _resolve_llm_client(llm_client_conf)
+    return embed_client, llm_client
+
 
+def _resolve_llm_client(llm_client_conf: str):
+    """
+    Resolve the LLM client.
+
+    Args:
+        llm_client_conf (str): The LLM client configuration.
+
+    Returns:
+        The connected LLM client.
+    """
     llm_client = None
     if llm_client_conf == "huggingface":
         llm_client = HuggingFaceClient()
@@ -160,7 +275,51 @@ def _resolve_clients(embed_client_conf: str, llm_client_conf: str):
         raise ValueError(f"LLM client {llm_client} is not supported.")
     assert llm_client is not None, "LLM client is missing."
     llm_client.connect()
-    return embed_client, llm_client
+    return llm_client
+
+
+def _resolve_embed_client(embed_client_conf: str):
+    """
+    Resolve the embedding client.
+
+    Args:
+        embed_client_conf (str): The embedding client configuration.
+
+    Returns:
+        The connected embedding client.
+    """
+    embed_client = None
+    if embed_client_conf == "huggingface":
+        embed_client = HuggingFaceClient()
+    elif embed_client_conf == "vertex":
+        embed_client = VertexClient()
+    elif embed_client_conf == "azure":
+        embed_client = AzureClient()
+    elif embed_client_conf == "openai":
+        embed_client = OpenAIClient()
+    else:
+        raise ValueError(f"Embedding client {embed_client} is not supported.")
+    assert embed_client is not None, "Embedding client is missing."
+    embed_client.connect()
+    return embed_client
+
+
+def _resolve_rerank_client(rerank_client_conf: str, self_hosted: Optional[bool] = False):
+    """
+    Resolve the rerank client.
+
+    Args:
+        rerank_client_conf (str): The rerank client configuration.
+        self_hosted (bool, optional): Whether the rerank model is self-hosted. Defaults to False.
+
+    Returns:
+        The connected rerank client.
+    """
+    if rerank_client_conf != "huggingface":
+        raise ValueError(f"Rerank client {rerank_client_conf} is not supported.")
+    rerank_client = HuggingFaceClient()
+    rerank_client.connect(self_hosted=self_hosted)
+    return rerank_client
 
 # from typing import Optional, Union, Callable
 # from pathlib import PosixPath
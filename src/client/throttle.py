@@ -0,0 +1,212 @@
+import time
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Sequence
+from loguru import logger
+
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.llms import LLM
+from llama_index.core.utils import get_tokenizer
+
+
+class TokenBudgetExceeded(RuntimeError):
+    pass
+
+
+class RateLimiter:
+    """
+    Spaces the requests to a vendor evenly, safe to share between threads and event loops.
+
+    Every caller reserves the next free slot under a lock and then sleeps until its slot,
+    a limit of 0 requests per minute disables the limiter.
+    """
+
+    def __init__(self, requests_per_minute: int) -> None:
+        self._interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        if not self._interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+        return slot - now
+
+    def wait(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def await_slot(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class TokenBudget:
+    """
+    Running count of the prompt and completion tokens spent against an optional limit.
+    """
+
+    def __init__(self, limit: Optional[int] = None) -> None:
+        self._limit = limit
+        self._lock = threading.Lock()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    @property
+    def spent(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def charge_prompt(self, tokens: int) -> None:
+        with self._lock:
+            if self._limit is not None and self.spent + tokens > self._limit:
+                raise TokenBudgetExceeded(f"Token budget of {self._limit} exhausted after {self.spent} tokens.")
+            self.prompt_tokens += tokens
+
+    def charge_completion(self, tokens: int) -> None:
+        with self._lock:
+            self.completion_tokens += tokens
+
+
+_RATE_LIMITERS: Dict[str, RateLimiter] = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(vendor: str, requests_per_minute: int) -> RateLimiter:
+    """
+    Returns the rate limiter of a vendor, all LLMs of the same vendor share one limiter.
+    """
+    with _RATE_LIMITERS_LOCK:
+        if vendor not in _RATE_LIMITERS:
+            _RATE_LIMITERS[vendor] = RateLimiter(requests_per_minute)
+        return _RATE_LIMITERS[vendor]
+
+
+class ThrottledLLM(LLM):
+    """
+    LLM wrapper which rate limits the calls per vendor and charges their tokens to a budget.
+
+    Prompts are formatted exactly as the wrapped LLM formats them, the wrapped LLM receives
+    the formatted prompt and is only called once the rate limiter grants a slot.
+    """
+
+    llm: LLM = Field(description="The wrapped LLM.")
+    vendor: str = Field(description="The vendor sharing the rate limit.")
+    _rate_limiter: RateLimiter = PrivateAttr()
+    _budget: TokenBudget = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+
+    def __init__(self, llm: LLM, vendor: str, requests_per_minute: Optional[int] = 0, token_budget: Optional[int] = None) -> None:
+        """
+        Initializes the ThrottledLLM object.
+
+        Args:
+            llm (LLM): The LLM returned by the client connector.
+            vendor (str): The vendor of the LLM, e.g. "grok".
+            requests_per_minute (int, optional): The request limit of the vendor, 0 for unlimited. Defaults to 0.
+            token_budget (int, optional): The number of tokens the LLM may spend. Defaults to unlimited.
+
+        Returns:
+            None
+        """
+        super().__init__(
+            llm=llm,
+            vendor=vendor,
+            callback_manager=llm.callback_manager,
+            system_prompt=llm.system_prompt,
+            messages_to_prompt=llm.messages_to_prompt,
+            completion_to_prompt=llm.completion_to_prompt,
+            output_parser=llm.output_parser,
+            pydantic_program_mode=llm.pydantic_program_mode,
+        )
+        self._rate_limiter = get_rate_limiter(vendor, requests_per_minute)
+        self._budget = TokenBudget(token_budget)
+        self._tokenizer = get_tokenizer()
+        logger.info(f"[THROTTLE] {vendor} limited to {requests_per_minute or 'unlimited'} requests per minute, token budget {token_budget or 'unlimited'}.")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ThrottledLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return self.llm.metadata
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self._budget.prompt_tokens,
+            "completion_tokens": self._budget.completion_tokens,
+        }
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        self._before_call(self._count_messages(messages))
+        response = self.llm.chat(messages, **kwargs)
+        self._budget.charge_completion(self._count(response.message.content))
+        return response
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        self._before_call(self._count(prompt))
+        response = self.llm.complete(prompt, formatted=formatted, **kwargs)
+        self._budget.charge_completion(self._count(response.text))
+        return response
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        self._before_call(self._count_messages(messages))
+        return self.llm.stream_chat(messages, **kwargs)
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        self._before_call(self._count(prompt))
+        return self.llm.stream_complete(prompt, formatted=formatted, **kwargs)
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        await self._abefore_call(self._count_messages(messages))
+        response = await self.llm.achat(messages, **kwargs)
+        self._budget.charge_completion(self._count(response.message.content))
+        return response
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        await self._abefore_call(self._count(prompt))
+        response = await self.llm.acomplete(prompt, formatted=formatted, **kwargs)
+        self._budget.charge_completion(self._count(response.text))
+        return response
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        await self._abefore_call(self._count_messages(messages))
+        return await self.llm.astream_chat(messages, **kwargs)
+
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseAsyncGen:
+        await self._abefore_call(self._count(prompt))
+        return await self.llm.astream_complete(prompt, formatted=formatted, **kwargs)
+
+    # ---- ---- ---- ---- ---- <
+    # > Private Methods
+    # ---- ---- ---- ---- ---- <
+
+    def _count(self, text: Optional[str]) -> int:
+        return len(self._tokenizer(text)) if text else 0
+
+    def _count_messages(self, messages: Sequence[ChatMessage]) -> int:
+        return sum(self._count(message.content) for message in messages)
+
+    def _before_call(self, prompt_tokens: int) -> None:
+        # The budget is charged before waiting for a slot, an exhausted budget fails fast.
+        self._budget.charge_prompt(prompt_tokens)
+        self._rate_limiter.wait()
+
+    async def _abefore_call(self, prompt_tokens: int) -> None:
+        self._budget.charge_prompt(prompt_tokens)
+        await self._rate_limiter.await_slot()
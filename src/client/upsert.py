@@ -0,0 +1,84 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+# Statuses on which a request is retried: throttling and transient server errors.
+_RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return getattr(error, "status", None) in _RETRYABLE_STATUSES
+
+
+def bulk_upsert(
+    index: Any,
+    vectors: List[Dict[str, Any]],
+    namespace: Optional[str] = None,
+    batch_size: Optional[int] = 100,
+    max_workers: Optional[int] = 8,
+    max_retries: Optional[int] = 5,
+    backoff_seconds: Optional[float] = 0.5,
+) -> Dict[str, float]:
+    """
+    Upserts the vectors in batches sent concurrently over the connection pool of the index.
+
+    Any object with the `upsert(vectors, namespace)` method of a Pinecone index is accepted, so an
+    in-process stand-in can replace the remote index. Throttled and failed requests are retried
+    with an exponential backoff and jitter, the last error is raised once the retries are exhausted.
+
+    Args:
+        index (Any): The index handle, shared by the concurrent requests.
+        vectors (List[Dict[str, Any]]): The vectors, as dictionaries with "id", "values" and "metadata".
+        namespace (str, optional): The namespace of the vectors. Defaults to the default namespace.
+        batch_size (int, optional): The number of vectors per request. Defaults to 100.
+        max_workers (int, optional): The number of concurrent requests. Defaults to 8.
+        max_retries (int, optional): The number of retries of a failing request. Defaults to 5.
+        backoff_seconds (float, optional): The delay before the first retry, doubled on every retry. Defaults to 0.5.
+
+    Returns:
+        Dict[str, float]: The number of upserted vectors, requests, retries, seconds and vectors per second.
+    """
+    batches = [vectors[start:start + batch_size] for start in range(0, len(vectors), batch_size)]
+    retries = 0
+    retries_lock = threading.Lock()
+
+    def upsert_batch(batch: List[Dict[str, Any]]) -> None:
+        nonlocal retries
+        for attempt in range(max_retries + 1):
+            try:
+                index.upsert(vectors=batch, namespace=namespace)
+                return
+            except Exception as e:
+                if attempt == max_retries or not _is_retryable(e):
+                    raise
+                with retries_lock:
+                    retries += 1
+                delay = backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+                logger.warning(f"[UPSERT] Request of {len(batch)} vectors failed ({e}), retrying in {delay:.1f}s.")
+                time.sleep(delay)
+
+    start_time = time.perf_counter()
+    if len(batches) <= 1 or max_workers <= 1:
+        for batch in batches:
+            upsert_batch(batch)
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches)), thread_name_prefix="upsert") as executor:
+            # Consuming the results raises the first failed request.
+            for _ in executor.map(upsert_batch, batches):
+                pass
+    elapsed = time.perf_counter() - start_time
+
+    stats = {
+        "vectors": len(vectors),
+        "requests": len(batches),
+        "retries": retries,
+        "seconds": elapsed,
+        "vectors_per_second": len(vectors) / elapsed if elapsed else 0.0,
+    }
+    logger.info(f"[UPSERT] Upserted {len(vectors)} vectors in {len(batches)} requests, {stats['vectors_per_second']:.0f} vectors/s.")
+    return stats
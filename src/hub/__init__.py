@@ -1 +1,4 @@
-from .pipeline import Pipeline
\ No newline at end of file
+from .pipeline import Pipeline
+from .engine import astream_response
+from .citation import Citation
+from .context import RequestContext
@@ -0,0 +1,150 @@
+import os
+import threading
+from pathlib import PosixPath, Path
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+from loguru import logger
+
+from watchdog.events import FileSystemEventHandler, FileSystemEvent
+from watchdog.observers import Observer
+
+
+class SourceCatalog:
+    """
+    Catalog of the source files, keyed by file name and by resolved file path.
+
+    The source tree is walked once when the catalog is built, afterwards the catalog is kept
+    up to date from filesystem events instead of walking the tree per lookup.
+    """
+
+    def __init__(self, source_path: PosixPath) -> None:
+        """
+        Initializes the SourceCatalog object.
+
+        Args:
+            source_path (PosixPath): The root directory of the source documents.
+
+        Returns:
+            None
+        """
+        self._source_path = Path(source_path).resolve()
+        self._by_name: Dict[str, List[str]] = defaultdict(list)
+        self._paths: Set[str] = set()
+        self._lock = threading.Lock()
+        self._observer = None
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def build(self) -> 'SourceCatalog':
+        with self._lock:
+            self._by_name.clear()
+            self._paths.clear()
+            self._add_tree(str(self._source_path))
+        logger.info(f"[CATALOG] Cataloged {len(self._paths)} source files under {self._source_path}.")
+        return self
+
+    def watch(self) -> None:
+        """
+        Starts refreshing the catalog incrementally from filesystem events.
+        """
+        if self._observer is not None:
+            return
+        observer = Observer()
+        observer.schedule(_CatalogEventHandler(self), str(self._source_path), recursive=True)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+        logger.info(f"[CATALOG] Watching {self._source_path} for changes.")
+
+    def stop(self) -> None:
+        if self._observer is None:
+            return
+        self._observer.stop()
+        self._observer.join()
+        self._observer = None
+
+    def find(self, file_name: Optional[str] = None, file_path: Optional[str] = None) -> Optional[str]:
+        """
+        Finds a source file by its node metadata, the file path takes precedence over the file name.
+
+        Args:
+            file_name (str, optional): The name of the file.
+            file_path (str, optional): The path of the file as recorded during ingestion.
+
+        Returns:
+            Optional[str]: The path of the found file, or None if the file is not found.
+        """
+        with self._lock:
+            if file_path:
+                resolved_path = os.path.realpath(file_path)
+                if resolved_path in self._paths:
+                    return resolved_path
+            if file_name:
+                paths = self._by_name.get(file_name, None)
+                if paths:
+                    return paths[0]
+        return None
+
+    def files(self, suffix: Optional[str] = None) -> List[str]:
+        with self._lock:
+            return sorted(path for path in self._paths if suffix is None or path.endswith(suffix))
+
+    # ---- ---- ---- ---- ---- <
+    # > Private Methods
+    # ---- ---- ---- ---- ---- <
+
+    def _add_tree(self, path: str) -> None:
+        if os.path.isfile(path):
+            self._add_file(path)
+            return
+        for root, _, files in os.walk(path):
+            for file in files:
+                self._add_file(os.path.join(root, file))
+
+    def _add_file(self, path: str) -> None:
+        path = os.path.realpath(path)
+        if path in self._paths:
+            return
+        self._paths.add(path)
+        self._by_name[os.path.basename(path)].append(path)
+
+    def _remove_tree(self, path: str) -> None:
+        path = os.path.realpath(path)
+        removed = [known for known in self._paths if known == path or known.startswith(path + os.sep)]
+        for known in removed:
+            self._paths.discard(known)
+            paths = self._by_name.get(os.path.basename(known), [])
+            if known in paths:
+                paths.remove(known)
+            if not paths:
+                self._by_name.pop(os.path.basename(known), None)
+
+    def _on_created(self, path: str) -> None:
+        with self._lock:
+            self._add_tree(path)
+
+    def _on_deleted(self, path: str) -> None:
+        with self._lock:
+            self._remove_tree(path)
+
+    def _on_moved(self, src_path: str, dest_path: str) -> None:
+        with self._lock:
+            self._remove_tree(src_path)
+            if dest_path.startswith(str(self._source_path)):
+                self._add_tree(dest_path)
+
+
+class _CatalogEventHandler(FileSystemEventHandler):
+    def __init__(self, catalog: SourceCatalog) -> None:
+        super().__init__()
+        self._catalog = catalog
+
+    def on_created(self, event: FileSystemEvent) -> None:
+        self._catalog._on_created(event.src_path)
+
+    def on_deleted(self, event: FileSystemEvent) -> None:
+        self._catalog._on_deleted(event.src_path)
+
+    def on_moved(self, event: FileSystemEvent) -> None:
+        self._catalog._on_moved(event.src_path, event.dest_path)
@@ -0,0 +1,66 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from utils import methods
+
+from llama_index.core.schema import NodeWithScore
+
+from .catalog import SourceCatalog
+
+
+@dataclass
+class Citation:
+    file_name: str
+    file_path: Optional[str] = None
+    pages: List[str] = field(default_factory=list)
+    score: Optional[float] = None
+    rank: int = 0
+
+    @property
+    def label(self) -> str:
+        if not self.pages:
+            return self.file_name
+        prefix = "p." if len(self.pages) == 1 else "pp."
+        return f"{self.file_name} ({prefix} {', '.join(self.pages)})"
+
+
+def extract_citations(source_nodes: List[NodeWithScore], catalog: Optional[SourceCatalog] = None, max_citations: Optional[int] = None) -> List[Citation]:
+    """
+    Extracts the cited source files of a response straight from the node metadata.
+
+    Nodes of the same file are merged into one citation with all of their pages. Citations are ranked
+    by the position of their best node, source nodes arrive best first whatever the score orientation
+    of the vector store is.
+
+    Args:
+        source_nodes (List[NodeWithScore]): The source nodes of the response.
+        catalog (SourceCatalog, optional): Resolves the file paths of the cited files on disk.
+        max_citations (int, optional): The maximum number of citations returned. Defaults to all.
+
+    Returns:
+        List[Citation]: The deduplicated citations, best first.
+    """
+    citations: Dict[str, Citation] = {}
+    for reference in methods.fetch_source_references(source_nodes):
+        file_name = reference["file_name"]
+        if file_name is None:
+            continue
+        key = reference["file_path"] or file_name
+        citation = citations.get(key, None)
+        if citation is None:
+            file_path = reference["file_path"]
+            if catalog is not None:
+                file_path = catalog.find(file_name=file_name, file_path=file_path)
+            citation = Citation(file_name=file_name, file_path=file_path, score=reference["score"], rank=len(citations))
+            citations[key] = citation
+        page_label = reference["page_label"]
+        if page_label is not None and str(page_label) not in citation.pages:
+            citation.pages.append(str(page_label))
+
+    ranked = list(citations.values())
+    for citation in ranked:
+        citation.pages.sort(key=_page_order)
+    return ranked[:max_citations] if max_citations is not None else ranked
+
+
+def _page_order(page_label: str):
+    return (0, int(page_label), page_label) if page_label.isdigit() else (1, 0, page_label)
@@ -0,0 +1,50 @@
+from typing import List, Optional
+from loguru import logger
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import QueryBundle
+
+
+class RequestContext:
+    """
+    State of a single user message, shared by the router, the answer cache and the retriever.
+
+    The message is embedded at most once, on first use, with the retrieval embedding model. Messages
+    answered by the string rules of the router are never embedded.
+    """
+
+    def __init__(self, message: str, embed_model: BaseEmbedding) -> None:
+        """
+        Initializes the RequestContext object.
+
+        Args:
+            message (str): The message from the user.
+            embed_model (BaseEmbedding): The retrieval embedding model.
+
+        Returns:
+            None
+        """
+        self.message = message
+        self._embed_model = embed_model
+        self._embedding: Optional[List[float]] = None
+
+    def embedding(self) -> List[float]:
+        if self._embedding is None:
+            self._embedding = self._embed_model.get_query_embedding(self.message)
+            logger.debug("[CONTEXT] Embedded the message of the request.")
+        return self._embedding
+
+    async def aembedding(self) -> List[float]:
+        if self._embedding is None:
+            self._embedding = await self._embed_model.aget_query_embedding(self.message)
+            logger.debug("[CONTEXT] Embedded the message of the request.")
+        return self._embedding
+
+    def query_bundle(self) -> QueryBundle:
+        """
+        The query of the message with its embedding, retrievers do not embed it again.
+        """
+        return QueryBundle(query_str=self.message, embedding=self.embedding())
+
+    async def aquery_bundle(self) -> QueryBundle:
+        return QueryBundle(query_str=self.message, embedding=await self.aembedding())
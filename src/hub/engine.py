@@ -0,0 +1,161 @@
+import json
+import asyncio
+from pathlib import PosixPath, Path
+from dataclasses import dataclass, asdict
+from typing import AsyncGenerator, List, Optional
+from loguru import logger
+
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.response.schema import RESPONSE_TYPE, Response, StreamingResponse, AsyncStreamingResponse
+from llama_index.core.callbacks.schema import CBEventType, EventPayload
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+
+FAILED_RETRIEVAL_RESPONSE = (
+    "I'm sorry, the provided context does not include specific information about your question. "
+    "It is not provided in the available documents."
+)
+
+
+@dataclass
+class RetrievalGate:
+    """
+    Minimum retrieval confidence a query has to reach before the LLM is called.
+
+    `higher_is_better` follows the metric of the vector store: True for similarities (cosine, dot product),
+    False for distances (euclidean).
+    """
+    threshold: float
+    higher_is_better: bool = True
+    quantile: Optional[float] = None
+    samples: Optional[int] = None
+
+    def best_score(self, nodes: List[NodeWithScore]) -> Optional[float]:
+        scores = [node.score for node in nodes if node.score is not None]
+        if not scores:
+            return None
+        return max(scores) if self.higher_is_better else min(scores)
+
+    def passes(self, nodes: List[NodeWithScore]) -> bool:
+        best_score = self.best_score(nodes)
+        if best_score is None:
+            return bool(nodes)
+        if self.higher_is_better:
+            return best_score >= self.threshold
+        return best_score <= self.threshold
+
+    @classmethod
+    def calibrate(cls, best_scores: List[float], higher_is_better: bool, quantile: Optional[float] = 0.05) -> 'RetrievalGate':
+        """
+        Calibrates the gate on the best retrieval scores of in-domain questions, such that only
+        the given fraction of them would have been rejected.
+        """
+        assert best_scores, "No scores to calibrate the gate on."
+        ordered = sorted(best_scores, reverse=not higher_is_better)
+        position = min(int(quantile * len(ordered)), len(ordered) - 1)
+        return cls(threshold=ordered[position], higher_is_better=higher_is_better, quantile=quantile, samples=len(ordered))
+
+    @classmethod
+    def load(cls, path: PosixPath) -> Optional['RetrievalGate']:
+        if not Path(path).exists():
+            return None
+        with open(path, 'r') as file:
+            return cls(**json.load(file))
+
+    def save(self, path: PosixPath) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(asdict(self), file, indent=2)
+
+
+class GatedRetriever(BaseRetriever):
+    """
+    Returns no nodes at all when the best hit of the wrapped retriever does not pass the gate.
+    """
+
+    def __init__(self, retriever: BaseRetriever, gate: RetrievalGate) -> None:
+        super().__init__()
+        self._retriever = retriever
+        self._gate = gate
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._apply_gate(self._retriever.retrieve(query_bundle))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._apply_gate(await self._retriever.aretrieve(query_bundle))
+
+    def _apply_gate(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        if self._gate.passes(nodes):
+            return nodes
+        logger.warning(
+            f"[GATE] Best retrieval score {self._gate.best_score(nodes)} does not pass the threshold {self._gate.threshold}."
+        )
+        return []
+
+
+class GatedRetrieverQueryEngine(RetrieverQueryEngine):
+    """
+    Query engine which answers with FAILED_RETRIEVAL_RESPONSE, without calling the LLM, when retrieval yields no nodes.
+    """
+
+    def _query(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        with self.callback_manager.event(
+            CBEventType.QUERY, payload={EventPayload.QUERY_STR: query_bundle.query_str}
+        ) as query_event:
+            nodes = self.retrieve(query_bundle)
+            if nodes:
+                response = self._response_synthesizer.synthesize(query=query_bundle, nodes=nodes)
+            else:
+                response = self._failed_retrieval_response()
+            query_event.on_end(payload={EventPayload.RESPONSE: response})
+        return response
+
+    async def _aquery(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        with self.callback_manager.event(
+            CBEventType.QUERY, payload={EventPayload.QUERY_STR: query_bundle.query_str}
+        ) as query_event:
+            nodes = await self.aretrieve(query_bundle)
+            if nodes:
+                response = await self._response_synthesizer.asynthesize(query=query_bundle, nodes=nodes)
+            else:
+                response = self._failed_retrieval_response()
+            query_event.on_end(payload={EventPayload.RESPONSE: response})
+        return response
+
+    async def aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        nodes = await self._retriever.aretrieve(query_bundle)
+        if not self._node_postprocessors:
+            return nodes
+        # Postprocessors such as rerankers run models on CPU, off the event loop
+        return await asyncio.to_thread(self._apply_node_postprocessors, nodes, query_bundle=query_bundle)
+
+    def _failed_retrieval_response(self) -> RESPONSE_TYPE:
+        logger.warning("[GATE] Skipping synthesis, no confident context was retrieved.")
+        if getattr(self._response_synthesizer, "_streaming", False):
+            return StreamingResponse(response_gen=iter([FAILED_RETRIEVAL_RESPONSE]), source_nodes=[])
+        return Response(FAILED_RETRIEVAL_RESPONSE, source_nodes=[])
+
+
+async def astream_response(response: RESPONSE_TYPE) -> AsyncGenerator[str, None]:
+    """
+    Yields the tokens of a query engine response without blocking the event loop.
+
+    Async streaming synthesizers still hand back a synchronous token generator, whose every step
+    waits on the LLM, hence each step is taken in a worker thread.
+    """
+    if isinstance(response, AsyncStreamingResponse):
+        async for token in response.async_response_gen():
+            yield token
+    elif isinstance(response, StreamingResponse):
+        if response.response_gen is None:
+            yield response.response_txt or ""
+            return
+        finished = object()
+        while True:
+            token = await asyncio.to_thread(next, response.response_gen, finished)
+            if token is finished:
+                break
+            yield token
+    else:
+        yield str(response)
@@ -0,0 +1,302 @@
+import time
+import queue
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from loguru import logger
+
+from llama_index.core import Document
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import BaseNode, MetadataMode
+
+# Marks the end of a stage's output, every worker of the next stage receives one.
+# A failing stage sets the stop event instead, on which every stage returns.
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name: str, unit: str) -> None:
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float) -> None:
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def as_dict(self, elapsed: float) -> Dict[str, float]:
+        return {
+            self.unit: self.items,
+            "busy_seconds": self.busy_seconds,
+            "per_second": self.items / elapsed if elapsed else 0.0,
+        }
+
+
+class _FileTracker:
+    """
+    Counts the documents and nodes of every file still in flight. Documents arrive grouped by file,
+    a file is complete once the loader moved past it and all of its nodes are upserted.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending_documents = Counter()
+        self._pending_nodes = Counter()
+        self._loading = None
+        self._loaded = set()
+
+    def document_loaded(self, document: Document) -> List[str]:
+        file_path = document.metadata.get("file_path", None)
+        with self._lock:
+            self._pending_documents[file_path] += 1
+            if file_path == self._loading:
+                return []
+            previous, self._loading = self._loading, file_path
+            return self._loaded_past(previous)
+
+    def loading_finished(self) -> List[str]:
+        with self._lock:
+            previous, self._loading = self._loading, None
+            return self._loaded_past(previous)
+
+    def batch_transformed(self, documents: List[Document], nodes: List[BaseNode]) -> List[str]:
+        with self._lock:
+            for document in documents:
+                self._pending_documents[document.metadata.get("file_path", None)] -= 1
+            for node in nodes:
+                self._pending_nodes[node.metadata.get("file_path", None)] += 1
+            return self._pop_complete({document.metadata.get("file_path", None) for document in documents})
+
+    def nodes_upserted(self, nodes: List[BaseNode]) -> List[str]:
+        with self._lock:
+            for node in nodes:
+                self._pending_nodes[node.metadata.get("file_path", None)] -= 1
+            return self._pop_complete({node.metadata.get("file_path", None) for node in nodes})
+
+    def _loaded_past(self, file_path: Optional[str]) -> List[str]:
+        if file_path is None:
+            return []
+        self._loaded.add(file_path)
+        return self._pop_complete({file_path})
+
+    def _pop_complete(self, file_paths: set) -> List[str]:
+        complete = []
+        for file_path in file_paths:
+            if file_path in self._loaded and self._pending_documents[file_path] <= 0 and self._pending_nodes[file_path] <= 0:
+                self._loaded.discard(file_path)
+                self._pending_documents.pop(file_path, None)
+                self._pending_nodes.pop(file_path, None)
+                complete.append(file_path)
+        return complete
+
+
+class StreamingIngestion:
+    """
+    Streams documents through transformation, embedding and upsert stages running concurrently.
+
+    The stages are connected by bounded queues, a slow stage holds back the ones before it, so
+    only a few batches are in memory whatever the size of the corpus. Nodes are upserted as soon
+    as their batch is embedded instead of once the whole folder is extracted. The first error
+    of any stage stops the ingestion and is raised by `run`.
+
+    The callbacks are the checkpoints of the ingestion: `before_upsert` and `on_upserted` surround
+    every upserted batch, `on_file_complete` is called once every node of a file is upserted.
+    They are never called concurrently.
+    """
+
+    def __init__(
+        self,
+        transform: Callable[[List[Document]], List[BaseNode]],
+        embed_model: BaseEmbedding,
+        upsert: Callable[[List[BaseNode]], Any],
+        before_upsert: Optional[Callable[[List[BaseNode]], Any]] = None,
+        on_upserted: Optional[Callable[[List[BaseNode]], Any]] = None,
+        on_file_complete: Optional[Callable[[str], Any]] = None,
+        queue_size: Optional[int] = 4,
+        document_batch_size: Optional[int] = 16,
+        transform_workers: Optional[int] = 2,
+        upsert_batch_size: Optional[int] = 100,
+    ) -> None:
+        """
+        Initializes the StreamingIngestion object.
+
+        Args:
+            transform (Callable): Turns a batch of documents into nodes with their metadata.
+            embed_model (BaseEmbedding): The embedding model of the index.
+            upsert (Callable): Upserts a batch of embedded nodes to the vector store.
+            before_upsert (Callable, optional): Called with every batch of nodes before it is upserted.
+            on_upserted (Callable, optional): Called with every upserted batch of nodes.
+            on_file_complete (Callable, optional): Called with the `file_path` of every completely upserted file.
+            queue_size (int, optional): The number of batches buffered between two stages. Defaults to 4.
+            document_batch_size (int, optional): The number of documents transformed at once. Defaults to 16.
+            transform_workers (int, optional): The number of batches transformed concurrently. Defaults to 2.
+            upsert_batch_size (int, optional): The number of nodes upserted at once. Defaults to 100.
+
+        Returns:
+            None
+        """
+        self._transform = transform
+        self._embed_model = embed_model
+        self._upsert_nodes = upsert
+        self._before_upsert = before_upsert
+        self._on_upserted = on_upserted
+        self._on_file_complete = on_file_complete
+        self._queue_size = queue_size
+        self._document_batch_size = document_batch_size
+        self._transform_workers = transform_workers
+        self._upsert_batch_size = upsert_batch_size
+
+        self._files = _FileTracker()
+        self._callback_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._stats = {
+            "load": StageStats("load", "documents"),
+            "transform": StageStats("transform", "nodes"),
+            "embed": StageStats("embed", "nodes"),
+            "upsert": StageStats("upsert", "nodes"),
+        }
+        self._start_time = None
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        elapsed = time.perf_counter() - self._start_time if self._start_time is not None else 0.0
+        return {name: stage.as_dict(elapsed) for name, stage in self._stats.items()}
+
+    def run(self, documents: Iterable[Document]) -> int:
+        """
+        Ingests the documents and blocks until every node is upserted.
+
+        Returns:
+            int: The number of upserted nodes.
+        """
+        self._start_time = time.perf_counter()
+        documents_queue = queue.Queue(maxsize=self._queue_size)
+        nodes_queue = queue.Queue(maxsize=self._queue_size)
+        embedded_queue = queue.Queue(maxsize=self._queue_size)
+
+        threads = [threading.Thread(target=self._guard, args=(self._load, documents, documents_queue), name="ingest-load")]
+        threads += [
+            threading.Thread(target=self._guard, args=(self._transform_batches, documents_queue, nodes_queue), name=f"ingest-transform-{i}")
+            for i in range(self._transform_workers)
+        ]
+        threads += [
+            threading.Thread(target=self._guard, args=(self._embed_batches, nodes_queue, embedded_queue), name="ingest-embed"),
+            threading.Thread(target=self._guard, args=(self._upsert_batches, embedded_queue), name="ingest-upsert"),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+        for name, stage in self.stats().items():
+            logger.info(f"[INGEST] {name}: {stage}")
+        return self._stats["upsert"].items
+
+    # ---- ---- ---- ---- ---- <
+    # > Stages
+    # ---- ---- ---- ---- ---- <
+
+    def _load(self, documents: Iterable[Document], out_queue: queue.Queue) -> None:
+        batch, start_time = [], time.perf_counter()
+        for document in documents:
+            if self._stop.is_set():
+                return
+            batch.append(document)
+            self._files_completed(self._files.document_loaded(document))
+            if len(batch) == self._document_batch_size:
+                self._stats["load"].record(len(batch), time.perf_counter() - start_time)
+                self._put(out_queue, batch)
+                batch, start_time = [], time.perf_counter()
+        if batch:
+            self._stats["load"].record(len(batch), time.perf_counter() - start_time)
+            self._put(out_queue, batch)
+        self._files_completed(self._files.loading_finished())
+        for _ in range(self._transform_workers):
+            self._put(out_queue, _DONE)
+
+    def _transform_batches(self, in_queue: queue.Queue, out_queue: queue.Queue) -> None:
+        for batch in self._iterate(in_queue):
+            start_time = time.perf_counter()
+            nodes = self._transform(batch)
+            self._stats["transform"].record(len(nodes), time.perf_counter() - start_time)
+            self._files_completed(self._files.batch_transformed(batch, nodes))
+            self._put(out_queue, nodes)
+        self._put(out_queue, _DONE)
+
+    def _embed_batches(self, in_queue: queue.Queue, out_queue: queue.Queue) -> None:
+        for nodes in self._iterate(in_queue, producers=self._transform_workers):
+            start_time = time.perf_counter()
+            texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+            embeddings = self._embed_model.get_text_embedding_batch(texts)
+            for node, embedding in zip(nodes, embeddings):
+                node.embedding = embedding
+            self._stats["embed"].record(len(nodes), time.perf_counter() - start_time)
+            self._put(out_queue, nodes)
+        self._put(out_queue, _DONE)
+
+    def _upsert_batches(self, in_queue: queue.Queue) -> None:
+        pending: List[BaseNode] = []
+        for nodes in self._iterate(in_queue):
+            pending.extend(nodes)
+            while len(pending) >= self._upsert_batch_size:
+                self._upsert(pending[:self._upsert_batch_size])
+                pending = pending[self._upsert_batch_size:]
+        if pending and not self._stop.is_set():
+            self._upsert(pending)
+
+    def _upsert(self, nodes: List[BaseNode]) -> None:
+        start_time = time.perf_counter()
+        self._notify(self._before_upsert, nodes)
+        self._upsert_nodes(nodes)
+        self._notify(self._on_upserted, nodes)
+        self._files_completed(self._files.nodes_upserted(nodes))
+        self._stats["upsert"].record(len(nodes), time.perf_counter() - start_time)
+        logger.debug(f"[INGEST] Upserted {self._stats['upsert'].items} nodes.")
+
+    # ---- ---- ---- ---- ---- <
+    # > Private Methods
+    # ---- ---- ---- ---- ---- <
+
+    def _notify(self, callback: Optional[Callable], *args: Any) -> None:
+        if callback is None:
+            return
+        with self._callback_lock:
+            callback(*args)
+
+    def _files_completed(self, file_paths: List[str]) -> None:
+        for file_path in file_paths:
+            self._notify(self._on_file_complete, file_path)
+
+    def _guard(self, stage: Callable, *args: Any) -> None:
+        try:
+            stage(*args)
+        except BaseException as e:
+            logger.error(f"[INGEST] {threading.current_thread().name} failed: {e}")
+            self._errors.append(e)
+            self._stop.set()
+
+    def _iterate(self, in_queue: queue.Queue, producers: Optional[int] = 1):
+        done = 0
+        while done < producers and not self._stop.is_set():
+            try:
+                item = in_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                done += 1
+            else:
+                yield item
+
+    def _put(self, out_queue: queue.Queue, item: Any) -> None:
+        # Waits for room in the queue, a stopping ingestion drops the item as nobody consumes it anymore.
+        while not self._stop.is_set():
+            try:
+                out_queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
@@ -0,0 +1,222 @@
+import os
+import json
+import hashlib
+from pathlib import PosixPath, Path
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from loguru import logger
+
+
+@dataclass
+class ManifestDiff:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.deleted)
+
+    @property
+    def to_index(self) -> List[str]:
+        """ Files which have to be parsed, extracted and embedded again. """
+        return self.added + self.changed
+
+    @property
+    def to_remove(self) -> List[str]:
+        """ Files whose vectors are stale and have to be deleted from the store. """
+        return self.changed + self.deleted
+
+
+class IndexManifest:
+    """
+    Content-hash manifest of the source files backing a single folder index.
+
+    For every file (relative to the source folder) the manifest keeps the sha256 of its content
+    and the identifiers of the nodes which were upserted to the vector store for it.
+
+    The manifest doubles as the checkpoint of an index build. Files which are only partially
+    upserted are recorded without a hash, so that they show up as changed and are re-indexed,
+    and the index is only marked complete once the build finished. Node identifiers are appended
+    to a journal before they are upserted, the journal is folded into the manifest when it is
+    loaded, so vectors upserted after the last save are never orphaned.
+    """
+
+    def __init__(self, manifest_path: PosixPath, folder_path: PosixPath) -> None:
+        """
+        Initializes the IndexManifest object.
+
+        Args:
+            manifest_path (PosixPath): The path of the manifest file.
+            folder_path (PosixPath): The source folder indexed under the manifest.
+
+        Returns:
+            None
+        """
+        self._manifest_path = Path(manifest_path)
+        self._folder_path = Path(folder_path)
+        self._journal_path = self._manifest_path.with_suffix(".journal")
+        self._files: Dict[str, Dict] = {}
+        self._complete = True
+
+    @classmethod
+    def load(cls, manifest_path: PosixPath, folder_path: PosixPath) -> 'IndexManifest':
+        """
+        Loads the manifest from disk, an empty manifest is returned if the file does not exist.
+
+        Args:
+            manifest_path (PosixPath): The path of the manifest file.
+            folder_path (PosixPath): The source folder indexed under the manifest.
+
+        Returns:
+            IndexManifest: The loaded manifest.
+        """
+        instance = cls(manifest_path, folder_path)
+        if instance._manifest_path.exists():
+            with open(instance._manifest_path, 'r') as file:
+                data = json.load(file)
+            instance._files = data.get("files", dict())
+            instance._complete = data.get("complete", True)
+        instance._replay_journal()
+        return instance
+
+    @property
+    def exists(self) -> bool:
+        return self._manifest_path.exists()
+
+    @property
+    def complete(self) -> bool:
+        """ Whether the index behind the manifest was completely built. """
+        return self._complete
+
+    def mark_incomplete(self) -> None:
+        self._complete = False
+
+    def reset(self) -> None:
+        """
+        Forgets every file ahead of a build from scratch, the index is incomplete until the build completes.
+        """
+        self._files.clear()
+        self._complete = False
+
+    def mark_complete(self) -> None:
+        self._complete = True
+
+    @property
+    def files(self) -> List[str]:
+        return list(self._files.keys())
+
+    def scan(self) -> Dict[str, str]:
+        """
+        Hashes every non-hidden file under the source folder.
+
+        Returns:
+            Dict[str, str]: Mapping of the relative file path to the sha256 of its content.
+        """
+        assert self._folder_path.exists(), f"Source directory {self._folder_path} does not exist."
+        hashes = {}
+        for path in sorted(self._folder_path.rglob("*")):
+            relative_path = path.relative_to(self._folder_path)
+            if path.is_dir() or any(part.startswith(".") for part in relative_path.parts):
+                continue
+            hashes[str(relative_path)] = _hash_file(path)
+        return hashes
+
+    def diff(self, current_hashes: Dict[str, str]) -> ManifestDiff:
+        """
+        Compares the recorded hashes with the current state of the source folder.
+
+        Args:
+            current_hashes (Dict[str, str]): The result of `scan`.
+
+        Returns:
+            ManifestDiff: Files which were added, changed or deleted since the manifest was recorded.
+        """
+        diff = ManifestDiff()
+        for relative_path, sha256 in current_hashes.items():
+            recorded = self._files.get(relative_path, None)
+            if recorded is None:
+                diff.added.append(relative_path)
+            elif recorded["sha256"] != sha256:
+                diff.changed.append(relative_path)
+        diff.deleted = [relative_path for relative_path in self._files if relative_path not in current_hashes]
+        return diff
+
+    def absolute_path(self, relative_path: str) -> Path:
+        return self._folder_path / relative_path
+
+    def relative_path(self, file_path: str) -> Optional[str]:
+        """
+        Resolves the `file_path` node metadata to the manifest key, None if it lies outside the folder.
+        """
+        try:
+            return str(Path(file_path).resolve().relative_to(self._folder_path.resolve()))
+        except ValueError:
+            return None
+
+    def node_ids(self, relative_path: str) -> List[str]:
+        return list(self._files.get(relative_path, dict()).get("node_ids", []))
+
+    def record_file(self, relative_path: str, sha256: Optional[str], node_ids: List[str]) -> None:
+        """
+        Records the nodes of a file, a file recorded without its sha256 is partially indexed.
+        """
+        self._files[relative_path] = {"sha256": sha256, "node_ids": list(node_ids)}
+
+    def journal_nodes(self, node_ids_per_file: Dict[str, List[str]]) -> None:
+        """
+        Durably appends the node identifiers about to be upserted for the given files.
+        """
+        if not node_ids_per_file:
+            return
+        self._journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._journal_path, 'a') as file:
+            file.write(json.dumps(node_ids_per_file) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def forget_file(self, relative_path: str) -> List[str]:
+        """
+        Removes the file from the manifest.
+
+        Returns:
+            List[str]: The node identifiers which were recorded for the file.
+        """
+        return list(self._files.pop(relative_path, dict()).get("node_ids", []))
+
+    def save(self) -> None:
+        self._manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self._manifest_path.with_suffix(".tmp")
+        with open(temporary_path, 'w') as file:
+            json.dump({"folder": str(self._folder_path), "complete": self._complete, "files": self._files}, file, indent=2)
+        temporary_path.replace(self._manifest_path)
+        # Every journaled node is recorded in the saved manifest from here on.
+        self._journal_path.unlink(missing_ok=True)
+        logger.info(f"[MANIFEST] Saved manifest with {len(self._files)} files to {self._manifest_path}")
+
+    def _replay_journal(self) -> None:
+        if not self._journal_path.exists():
+            return
+        replayed = 0
+        with open(self._journal_path, 'r') as file:
+            for line in file:
+                try:
+                    node_ids_per_file = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line torn by a crash was never followed by its upsert.
+                    continue
+                for relative_path, node_ids in node_ids_per_file.items():
+                    recorded = self.node_ids(relative_path)
+                    known = set(recorded)
+                    self.record_file(relative_path, None, recorded + [node_id for node_id in node_ids if node_id not in known])
+                    replayed += len(node_ids)
+        self._complete = False
+        logger.warning(f"[MANIFEST] Replayed {replayed} journaled nodes of an interrupted build from {self._journal_path}")
+
+
+def _hash_file(path: PosixPath, chunk_size: Optional[int] = 1 << 20) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
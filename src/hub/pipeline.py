@@ -1,21 +1,43 @@
+import asyncio
 import numpy as np
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterable, Iterator, Tuple
 from pathlib import PosixPath, Path
 from loguru import logger
 from node import Config
 from node import read_configuration
-from client import instantiate_client_connector, ClientConnector
-from parser import transform_documents, load_documents
+from client import instantiate_client_connector, ClientConnector, ThrottledLLM
+from parser import transform_documents, load_documents, stream_documents
+from cache import DiskStore, CachedEmbedding, AnswerCache, CachedAnswer
+from .manifest import IndexManifest
+from .catalog import SourceCatalog
+from .citation import Citation, extract_citations
+from .retriever import MultiIndexRetriever, ThreadedRetriever, HybridRetriever
+from .sparse import SparseIndex, SparseRetriever
+from .ingest import StreamingIngestion
+from .context import RequestContext
+from router import IntentRouter, Intent, RouteDecision
+from session import UserMapping
+from .engine import RetrievalGate, GatedRetriever, GatedRetrieverQueryEngine
 from template import GENERIC_PROMPT_TEMPLATE, CONTEXT_AWARE_PROMPT_TEMPLATE, CONTEXT_AND_LANGUAGE_AWARE_TEMPLATE, DOC_TEMPLATE
 from llama_index.core import Document
 from llama_index.core import Settings
 from llama_index.core import VectorStoreIndex
-from llama_index.core.storage import StorageContext
+from llama_index.core.indices.utils import embed_nodes
 from llama_index.core import load_index_from_storage
 from llama_index.core import PromptTemplate
 from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.chat_engine import CondensePlusContextChatEngine
+from llama_index.core.vector_stores.types import FilterOperator, MetadataFilter, MetadataFilters
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pickle
+import time
 import os
+import threading
+
+RETRIEVAL_GATE_PATH = Path("data/eval") / "retrieval_gate.json"
+INTENT_THRESHOLDS_PATH = Path("data/eval") / "intent_thresholds.json"
 
 class Pipeline:
     """
@@ -38,20 +60,55 @@ class Pipeline:
         self._index_conf = None
         self._client_conf = None
         self._parser_conf = None
+        self._cache_conf = None
+        self._rerank_conf = None
+        self._hybrid_conf = None
+        self._extraction_conf = None
+        self._ingestion_conf = None
+        self._ann_conf = None
+        self._routing_conf = None
 
         # Connectors and Models
         self._client = None
         self._embed_model = None
         self._llm = None
+        self._metadata_llm = None
+        self._reranker = None
+        self._embed_dim = None
 
         # Indexes
         self._indexes = None
+        self._sparse_indexes: Dict[str, SparseIndex] = {}
+
+        # Physical index holding the vectors of an index name, the folders of a single index share it
+        self._vector_index_names: Dict[str, str] = {}
+        self._shared_index = None
 
         # Vector db client
         self._vector_db_client = None
 
+        # Intent routing
+        self._router = None
+
+        # Retrieval confidence gate, calibrated on the evaluation questions
+        self._retrieval_gate = None
+
+        # Semantic cache of answers per index identifier
+        self._answer_cache = None
+
+        # Category of the logged-in users and the query engines pooled per answer scope of the categories
+        self._user_mapping = None
+        self._category_engines: Dict[str, GatedRetrieverQueryEngine] = {}
+        self._category_engines_lock = threading.Lock()
+
+        # Extracted node metadata and parsed PDFs, replayed on rebuilds
+        self._extractor_store = None
+        self._parse_store = None
+
+        # Catalog of the source files cited in the answers
+        self._source_catalog = None
+
         self.fail_embeds = None
-        self.general_embeds = None
     
     @classmethod
     def from_conf(cls, conf_path: PosixPath) -> 'Pipeline':
@@ -69,6 +126,14 @@ class Pipeline:
         instance._index_conf = configuration.index
         instance._client_conf = configuration.client
         instance._parser_conf = configuration.parser
+        instance._cache_conf = configuration.cache
+        instance._rerank_conf = configuration.rerank
+        instance._hybrid_conf = configuration.hybrid
+        instance._extraction_conf = configuration.extraction
+        instance._ingestion_conf = configuration.ingestion
+        instance._ann_conf = configuration.ann
+        instance._routing_conf = configuration.routing
+        instance._user_mapping = UserMapping(mapping=configuration.routing.users) if configuration.routing.users is not None else UserMapping()
         assert instance._index_conf is not None, "Index configuration is missing."
         assert instance._client_conf is not None, "Client configuration is missing."
         assert instance._parser_conf is not None, "Parser configuration is missing."
@@ -85,151 +150,273 @@ class Pipeline:
             None
         """
         assert secrets_directory.exists(), "Secrets directory does not exist."
-        self._client: ClientConnector = instantiate_client_connector(self._client_conf, secrets_directory) 
+        self._client: ClientConnector = instantiate_client_connector(
+            self._client_conf,
+            secrets_directory,
+            connect_pinecone=self._index_conf.vector_store == "pinecone",
+        )
 
     def prepare_settings(self):
-        embed_model = self._client.load_embed_model()
+        embed_model = self._wrap_embed_model_with_cache(self._client.load_embed_model())
         llm = self._client.load_llm()
         self._llm = llm
         self._embed_model = embed_model
+        self._metadata_llm = self._load_metadata_llm()
 
-        self._vector_db_client = self._client.load_pinecone_client()
+        self._vector_db_client = self._load_vector_db_client()
+
+        if self._rerank_conf.enabled:
+            self._reranker = self._client.load_rerank_model(
+                top_n=self._rerank_conf.top_n,
+                batch_size=self._rerank_conf.batch_size,
+                backend=self._rerank_conf.backend,
+                cache_size=self._rerank_conf.cache_size,
+            )
+            if self._reranker is None:
+                logger.warning("[RERANK] Reranking is enabled but no rerank_model is configured, skipping it.")
 
         Settings.llm = self._llm
         Settings.embed_model = self._embed_model
         logger.info(f"[Settings]\n{Settings}")
 
-    def prepare_embeddings(self, parser_type: Optional[str] = "base", update_on_change: Optional[bool] = False):
-        if update_on_change:
-            raise NotImplementedError("Update on change is not yet implemented.")
+        self._answer_cache = AnswerCache(
+            self._embed_model,
+            similarity_threshold=self._cache_conf.answer_similarity_threshold,
+            ttl=self._cache_conf.answer_ttl_seconds,
+            max_entries=self._cache_conf.answer_max_entries,
+        )
+        self._extractor_store = DiskStore(
+            Path(self._cache_conf.path) / "extractors.sqlite",
+            max_entries=self._cache_conf.extractor_max_entries,
+        )
+        logger.info(f"[EXTRACTOR CACHE] Using extractor cache with {len(self._extractor_store)} entries.")
+        self._parse_store = DiskStore(Path(self._cache_conf.path) / "llamaparse.sqlite")
 
+    def prepare_embeddings(self, parser_type: Optional[str] = "base", update_on_change: Optional[bool] = False):
         if self._index_conf.index_type == "multiple":
-            index_names = self._index_conf.folder_indexes
-            index_complete_path = Path("data/vector")
-            folder_complete_path = Path("data/source")
-            use_existing_index = self._index_conf.load_existing_index_under_prefix
-            indexes = self._prepare_multiple_index(
-                index_names=index_names,
-                index_complete_path=index_complete_path,
-                folder_complete_path=folder_complete_path,
-                use_existing_index=use_existing_index,
-                parser_type=parser_type,
-            )
+            prepare_index = self._prepare_multiple_index
         elif self._index_conf.index_type == "single":
-            raise NotImplementedError("Single index is not yet implemented.")
+            prepare_index = self._prepare_single_index
         else:
             raise ValueError(f"Invalid index type: {self._index_conf.index_type}")
+        indexes = prepare_index(
+            index_names=self._index_conf.folder_indexes,
+            index_complete_path=Path("data/vector"),
+            folder_complete_path=Path("data/source"),
+            use_existing_index=self._index_conf.load_existing_index_under_prefix,
+            parser_type=parser_type,
+            update_on_change=update_on_change,
+        )
         self._indexes = indexes
+        with self._category_engines_lock:
+            self._category_engines.clear()
+
+        self._retrieval_gate = RetrievalGate.load(RETRIEVAL_GATE_PATH)
+        if self._retrieval_gate is not None and self._retrieval_gate.higher_is_better != self._vector_db_client.higher_is_better:
+            logger.warning("[GATE] The retrieval gate was calibrated for another vector store metric, recalibrate it.")
+            self._retrieval_gate = None
+        if self._retrieval_gate is None:
+            logger.warning(f"[GATE] No calibrated retrieval gate found at {RETRIEVAL_GATE_PATH}, every query reaches the LLM.")
+        else:
+            logger.info(f"[GATE] Using retrieval gate: {self._retrieval_gate}")
+
+    def prepare_catalog(self, source_path: Optional[PosixPath] = Path("data/source"), watch: Optional[bool] = True) -> SourceCatalog:
+        """
+        Builds the catalog of the source files once, optionally keeping it up to date from filesystem events.
+
+        Args:
+            source_path (PosixPath, optional): The root directory of the source documents. Defaults to "data/source".
+            watch (bool, optional): Refresh the catalog on filesystem changes. Defaults to True.
+
+        Returns:
+            SourceCatalog: The catalog of the source files.
+        """
+        self._source_catalog = SourceCatalog(source_path).build()
+        if watch:
+            self._source_catalog.watch()
+        return self._source_catalog
+
+    @property
+    def source_catalog(self) -> SourceCatalog:
+        assert self._source_catalog is not None, "Source catalog is not yet prepared, call prepare_catalog first."
+        return self._source_catalog
+
+    def spawn_query_engine(self, index_identifier: Optional[str] = "commercial_index", filters: Optional[Dict[str, str]] = None):
+        """
+        Spawns a query engine over an index, or over every index with "all".
+
+        Args:
+            index_identifier (str, optional): The index name or "all". Defaults to "commercial_index".
+            filters (Dict[str, str], optional): Metadata the retrieved nodes must match, e.g. {"file_name": "contract.pdf"}.
+                Pushed down to the vector store, the sparse retrieval is skipped. Defaults to no filters.
 
-    def spawn_query_engine(self, index_identifier: Optional[str] = "commercial_index"):
+        Returns:
+            GatedRetrieverQueryEngine: The query engine.
+        """
         assert self._indexes is not None, "Indexes are not yet prepared."
 
-        # FIXME: should be taken from the configuration
-        index = None
-        if index_identifier == "all":
-            raise NotImplementedError("Querying all indexes is not yet implemented.")
-        elif index_identifier == "commercial-index":
-            index = self._indexes.get("commercial-index", None)
-        elif index_identifier == "zahid-index":
-            index = self._indexes.get("zahid-index", None)
-        elif index_identifier == "mostostal-index":
-            index = self._indexes.get("mostostal-index", None)
-        else:
-            raise ValueError(f"Invalid index identifier: {index_identifier}")
-        assert index is not None, "Index is missing."
-        query_engine = index.as_query_engine(similarity_top_k=5, response_mode="simple_summarize", streaming=True)
-        # from IPython.display import Markdown, display
-        # def display_prompt_dict(prompts_dict):
-        #     for k, p in prompts_dict.items():
-        #         text_md = f"**Prompt Key**: {k}<br>" f"**Text:** <br>"
-        #         print(text_md)
-        #         # display(Markdown(text_md))
-        #         print(p.get_template())
-        #         # display(Markdown("<br><br>"))
-        # print("QQQQQQQQQ:\n", display_prompt_dict(query_engine.get_prompts()))
-        
-        # new_summary_tmpl_str = (
-        #     "Context information is below.\n"
-        #     "---------------------\n"
-        #     "{context_str}\n"
-        #     "---------------------\n"
-        #     "Given the context information and not prior knowledge, "
-        #     "answer the query. Answer the query as detailed as possible with all the relevant information about all the points included in the answer.\n"
-        #     "Query: {query_str}\n"
-        #     "Answer: "
-        # )
-        # new_summary_tmpl = PromptTemplate(new_summary_tmpl_str)
-        # query_engine.update_prompts(
-        #     {"text_qa_template": new_summary_tmpl}
-        # )
-        # print("QQQQQQQQQ:\n", display_prompt_dict(query_engine._response_synthesizer.get_prompts()))
+        retriever = self._spawn_retriever(index_identifier, similarity_top_k=self._retrieval_top_k(), filters=filters)
+        query_engine = GatedRetrieverQueryEngine.from_args(
+            retriever,
+            response_mode="simple_summarize",
+            streaming=True,
+            node_postprocessors=self._node_postprocessors(),
+        )
         self._update_engine_prompt(query_engine, prompt="doc", update_field='response_synthesizer:text_qa_template')
-        # print("QQQQQQQQQ:\n", display_prompt_dict(query_engine.get_prompts()))
         return query_engine
     
-    def spawn_chat_engine(self, index_identifier: Optional[str] = "commercial_index"):
+    def resolve_user_category(self, user_name: str) -> str:
+        """
+        Resolves the category of the logged-in user, users without one fall back to the default category of UserMapping.
+        """
+        category = self._user_mapping.get_category(user_name)
+        logger.info(f"[ROUTING] User {user_name} resolved to category {category}.")
+        return category
+
+    def spawn_category_engine(self, category: str) -> GatedRetrieverQueryEngine:
+        """
+        Returns the query engine scoped to the slice of the corpus of a category, shared by every session searching the slice.
+
+        Args:
+            category (str): The category of the user, see `resolve_user_category`.
+
+        Returns:
+            GatedRetrieverQueryEngine: The pooled query engine, spawned on the first request of the category.
+        """
+        scope = self.answer_scope(category)
+        with self._category_engines_lock:
+            engine = self._category_engines.get(scope, None)
+            if engine is None:
+                index_identifier, filters = self._category_route(category)
+                logger.warning(f"[ROUTING] Spawning the query engine of category {category} on {index_identifier} with filters {filters}.")
+                engine = self.spawn_query_engine(index_identifier=index_identifier, filters=filters)
+                self._category_engines[scope] = engine
+        return engine
+
+    def answer_scope(self, category: str) -> str:
+        """
+        The answer cache key of a category, categories searching the same slice share their answers.
+        """
+        index_identifier, filters = self._category_route(category)
+        if not filters:
+            return index_identifier
+        return index_identifier + "/" + ",".join(f"{key}={value}" for key, value in sorted(filters.items()))
+
+    def spawn_chat_engine(self, index_identifier: Optional[str] = "commercial_index", filters: Optional[Dict[str, str]] = None):
         assert self._indexes is not None, "Indexes are not yet prepared."
 
-        # FIXME: should be taken from the configuration
-        index = None
-        if index_identifier == "all":
-            raise NotImplementedError("Querying all indexes is not yet implemented.")
-        elif index_identifier == "commercial-index":
-            index = self._indexes.get("commercial-index", None)
-        elif index_identifier == "zahid-index":
-            index = self._indexes.get("zahid-index", None)
-        elif index_identifier == "mostostal-index":
-            index = self._indexes.get("mostostal-index", None)
-        else:
-            raise ValueError(f"Invalid index identifier: {index_identifier}")
-        assert index is not None, "Index is missing."
         memory = ChatMemoryBuffer.from_defaults(token_limit=8_000)
+        system_prompt = (
+            """You are a virtual assistant designated for the Zahid Group. Your primary function is to field inquiries
+            pertaining to business operations, human resources, company policies, and other aspects relevant to the organization.
+            Your responses should accurately address acronyms, abbreviations, and specialized jargon to maintain clear communication.
+            Be vigilant in understanding the context and details of each inquiry.
+            Please be aware that some questions may contain acronyms, abbreviations, or specialized terminology.
+            If a query is unclear or lacks information, do not hesitate to request additional details from the user.
+            Adhere to the following two critical guidelines:\n
+            1. Focus exclusively on topics directly related to the Zahid Group and source documents provided.\n
+            2. Respond to inquiries in the same language in which they are asked to ensure effective communication."""
+        )
+        if index_identifier == "all" or filters or self._shared_index is not None:
+            # The react agent queries the whole index, filtered and fan-out retrievers are wrapped in a context chat engine instead.
+            retriever = self._spawn_retriever(index_identifier, similarity_top_k=self._retrieval_top_k(), filters=filters)
+            return CondensePlusContextChatEngine.from_defaults(
+                retriever=retriever,
+                node_postprocessors=self._node_postprocessors(),
+                memory=memory,
+                system_prompt=system_prompt,
+                verbose=True,
+            )
+
+        index_name = self._resolve_index_names(index_identifier)[0]
+        index = self._indexes.get(index_name, None)
+        assert index is not None, "Index is missing."
         chat_engine = index.as_chat_engine(
             chat_mode="react",
             verbose=True,
             memory=memory,
-            system_prompt = (
-                """You are a virtual assistant designated for the Zahid Group. Your primary function is to field inquiries
-                pertaining to business operations, human resources, company policies, and other aspects relevant to the organization.
-                Your responses should accurately address acronyms, abbreviations, and specialized jargon to maintain clear communication.
-                Be vigilant in understanding the context and details of each inquiry.
-                Please be aware that some questions may contain acronyms, abbreviations, or specialized terminology.
-                If a query is unclear or lacks information, do not hesitate to request additional details from the user.
-                Adhere to the following two critical guidelines:\n
-                1. Focus exclusively on topics directly related to the Zahid Group and source documents provided.\n
-                2. Respond to inquiries in the same language in which they are asked to ensure effective communication."""
-            ), 
-
+            system_prompt=system_prompt,
         )
         return chat_engine
 
-    def load_embeddings(self):
-        general_question_templates = [
-            "What documents do you have?",
-            "What service can you provide?",
-            "Can you list the documents currently available?",
-            "What types of service do you offer?",
-            "What documents are stored in this system?",
-            "Can you describe the services you provide?",
-            "What are the available documents in your archive?",
-            "What specific services can this system offer?",
-            "What document collections do you have?",
-            "What can you provide in terms of service?"
-            "What files do you have"
-            "List all the files"
-            "Please list all the files you have",
-            "What is your file database",
-        ]
+    def measure_ann_recall(self, questions: List[str], index_identifier: Optional[str] = "all", top_k: Optional[int] = 5) -> Dict[str, float]:
+        """
+        Measures the recall@k of the compressed ANN indexes against an exact search on in-domain questions.
+
+        Args:
+            questions (List[str]): In-domain questions, e.g. the evaluation question set.
+            index_identifier (str, optional): The indexes measured. Defaults to "all".
+            top_k (int, optional): The number of retrieved nodes compared. Defaults to 5.
+
+        Returns:
+            Dict[str, float]: The recall@k per index name.
+        """
+        assert self._index_conf.vector_store == "ann", "Recall is only measured for the 'ann' vector store."
+        query_embeddings = [self._embed_model.get_query_embedding(question) for question in questions]
+        recalls = {}
+        # The folders of a single index are measured once, on the shared index.
+        for index_name in dict.fromkeys(self._vector_index_name(index_name) for index_name in self._resolve_index_names(index_identifier)):
+            if not self._vector_db_client.index_exists(index_name):
+                continue
+            recalls[index_name] = self._vector_db_client.recall(index_name, query_embeddings, top_k=top_k)
+            logger.warning(f"[ANN] {index_name}: recall@{top_k} {recalls[index_name]:.3f}, memory {self._vector_db_client.memory_stats(index_name)}")
+        return recalls
+
+    def calibrate_retrieval_gate(self, questions: List[str], index_identifier: Optional[str] = "all", quantile: Optional[float] = 0.05) -> RetrievalGate:
+        """
+        Calibrates the retrieval confidence gate on in-domain questions and stores it for later runs.
+
+        Args:
+            questions (List[str]): In-domain questions, e.g. the evaluation question set.
+            index_identifier (str, optional): The index the questions are asked against. Defaults to "all".
+            quantile (float, optional): The fraction of the questions the gate may reject. Defaults to 0.05.
+
+        Returns:
+            RetrievalGate: The calibrated gate.
+        """
+        assert self._indexes is not None, "Indexes are not yet prepared."
+        higher_is_better = self._vector_db_client.higher_is_better
+        index_names = [index_name for index_name in self._resolve_index_names(index_identifier) if index_name in self._indexes]
+        if self._shared_index is not None:
+            retrievers = [self._dense_retriever(index_names, similarity_top_k=1)]
+        else:
+            retrievers = [self._dense_retriever([index_name], similarity_top_k=1) for index_name in index_names]
+        best_scores = []
+        for question in questions:
+            scores = [node.score for retriever in retrievers for node in retriever.retrieve(question) if node.score is not None]
+            if scores:
+                best_scores.append(max(scores) if higher_is_better else min(scores))
+
+        self._retrieval_gate = RetrievalGate.calibrate(best_scores, higher_is_better=higher_is_better, quantile=quantile)
+        self._retrieval_gate.save(RETRIEVAL_GATE_PATH)
+        logger.warning(f"[GATE] Calibrated retrieval gate on {len(best_scores)} questions: {self._retrieval_gate}")
+        return self._retrieval_gate
+
+    def calibrate_router(self, messages: List[str], labels: List[Intent]) -> Dict[Intent, float]:
+        """
+        Calibrates the intent thresholds of the router on labelled messages and stores them for later runs.
+
+        Args:
+            messages (List[str]): The labelled messages.
+            labels (List[Intent]): The expected intent of each message, Intent.QUESTION for in-domain questions.
+
+        Returns:
+            Dict[Intent, float]: The calibrated thresholds.
+        """
+        assert self._router is not None, "Router is not yet prepared, call load_embeddings first."
+        thresholds = self._router.calibrate(messages, [Intent(label) for label in labels])
+        self._router.save_thresholds(INTENT_THRESHOLDS_PATH)
+        logger.warning(f"[ROUTER] Calibrated intent thresholds on {len(messages)} messages: {thresholds}")
+        return thresholds
 
-        if self.general_embeds is None:
-            if os.path.exists('general_embeds.pkl'):
-                with open('general_embeds.pkl', 'rb') as f:
-                    self.general_embeds = pickle.load(f)
+    def load_embeddings(self):
+        if self._router is None:
+            router_model = self._client.load_router_model() or self._embed_model
+            self._router = IntentRouter(router_model).fit()
+            if self._router.load_thresholds(INTENT_THRESHOLDS_PATH):
+                logger.info(f"[ROUTER] Using calibrated intent thresholds: {self._router.thresholds}")
             else:
-                print("running full")
-                self.general_embeds = self._embed_model.get_agg_embedding_from_queries(general_question_templates)
-                with open('general_embeds.pkl', 'wb') as f:
-                    pickle.dump(self.general_embeds, f)
+                logger.warning(f"[ROUTER] No calibrated intent thresholds found at {INTENT_THRESHOLDS_PATH}, using the defaults.")
 
         fail_ans_templates = [
             "the provided context does not include specific information",
@@ -254,32 +441,118 @@ class Pipeline:
                     pickle.dump(self.fail_embeds, f)
         
 
-    def check_if_user_asks_about_general_info(self, message: str) -> bool:
+    def new_request(self, message: str) -> RequestContext:
+        """
+        Creates the context of a user message, its embedding is shared by the router, the answer cache and the retriever.
+
+        Args:
+            message (str): The message from the user.
+
+        Returns:
+            RequestContext: The context, passed along with the message and queried through `context.query_bundle()`.
+        """
+        assert self._embed_model is not None, "Embedding model is not yet prepared, call prepare_settings first."
+        return RequestContext(message, self._embed_model)
+
+    def route_message(self, message: str, context: Optional[RequestContext] = None) -> RouteDecision:
+        """
+        Routes the user message to an intent (greeting, thanks, catalog, too short or question).
+
+        Args:
+            message (str): The message from the user.
+            context (RequestContext, optional): The context of the message, reused if the router embeds with the retrieval model.
+
+        Returns:
+            RouteDecision: The intent of the message and the similarity which decided it.
+        """
+        assert self._router is not None, "Router is not yet prepared, call load_embeddings first."
+        if context is not None and self._router.embed_model is self._embed_model:
+            decision = self._router.route_by_rules(message) or self._router.route_embedding(message, context.embedding())
+        else:
+            decision = self._router.route(message)
+        logger.info(f"[ROUTER] Message routed to {decision.intent.value} (score {decision.score:.3f}).")
+        return decision
+
+    async def aroute_message(self, message: str, context: Optional[RequestContext] = None) -> RouteDecision:
+        """
+        Async counterpart of route_message, routers on a blocking model are run in a worker thread.
+        """
+        assert self._router is not None, "Router is not yet prepared, call load_embeddings first."
+        if context is not None and self._router.embed_model is self._embed_model:
+            decision = self._router.route_by_rules(message) or self._router.route_embedding(message, await context.aembedding())
+        elif self._client.router_model_supports_async:
+            decision = await self._router.aroute(message)
+        else:
+            decision = await asyncio.to_thread(self._router.route, message)
+        logger.info(f"[ROUTER] Message routed to {decision.intent.value} (score {decision.score:.3f}).")
+        return decision
+
+    def check_if_user_asks_about_general_info(self, message: str, context: Optional[RequestContext] = None) -> bool:
         """
         Checks if the user asks about general information.
 
         Args:
             message (str): The message from the user.
+            context (RequestContext, optional): The context of the message, see `route_message`.
 
         Returns:
             bool: True if the user asks about general information, False otherwise.
         """
+        return self.route_message(message, context=context).intent == Intent.CATALOG
+
+    def lookup_answer(self, index_identifier: str, message: str, context: Optional[RequestContext] = None) -> Optional[CachedAnswer]:
+        """
+        Looks up an answer given earlier to the same or a rephrased question on the same index.
+
+        Args:
+            index_identifier (str): The index identifier the engine was spawned with.
+            message (str): The message from the user.
+            context (RequestContext, optional): The context of the message, its embedding is reused by the retrieval on a miss.
+
+        Returns:
+            Optional[CachedAnswer]: The cached answer with its source nodes, None on a miss.
+        """
+        assert self._answer_cache is not None, "Answer cache is not yet prepared, call prepare_settings first."
+        embedding = context.embedding() if context is not None else None
+        cached_answer = self._answer_cache.lookup(index_identifier, message, embedding=embedding)
+        logger.info(f"[ANSWER CACHE] {'Hit' if cached_answer is not None else 'Miss'} on {index_identifier}, statistics: {self._answer_cache.stats()}")
+        return cached_answer
+
+    async def alookup_answer(self, index_identifier: str, message: str, context: Optional[RequestContext] = None) -> Optional[CachedAnswer]:
+        assert self._answer_cache is not None, "Answer cache is not yet prepared, call prepare_settings first."
+        embedding = await context.aembedding() if context is not None else None
+        cached_answer = await self._answer_cache.alookup(index_identifier, message, embedding=embedding)
+        logger.info(f"[ANSWER CACHE] {'Hit' if cached_answer is not None else 'Miss'} on {index_identifier}, statistics: {self._answer_cache.stats()}")
+        return cached_answer
+
+    def store_answer(self, index_identifier: str, message: str, response: str, source_nodes: list, context: Optional[RequestContext] = None) -> None:
+        """
+        Stores a successful answer, failed retrievals should not be cached.
+        """
+        assert self._answer_cache is not None, "Answer cache is not yet prepared, call prepare_settings first."
+        embedding = context.embedding() if context is not None else None
+        self._answer_cache.store(index_identifier, message, text=response, source_nodes=source_nodes, embedding=embedding)
 
+    async def astore_answer(self, index_identifier: str, message: str, response: str, source_nodes: list, context: Optional[RequestContext] = None) -> None:
+        assert self._answer_cache is not None, "Answer cache is not yet prepared, call prepare_settings first."
+        embedding = await context.aembedding() if context is not None else None
+        await self._answer_cache.astore(index_identifier, message, text=response, source_nodes=source_nodes, embedding=embedding)
 
+    def answer_cache_stats(self) -> Dict[str, float]:
+        return self._answer_cache.stats() if self._answer_cache is not None else {}
 
-        # if self.general_embeds is None:
-        #     self.general_embeds = self._embed_model.get_agg_embedding_from_queries(general_question_templates)
-        import time
-        strt = time.time()
-        user_embeds = self._embed_model.get_agg_embedding_from_queries([message])
-        sim = self._embed_model.similarity(self.general_embeds, user_embeds)
-        end = time.time()
-        print("TIME: ", end-strt)
-        logger.warning(f"[SIMILARITY] User question to general similarity score: {sim}")
-        # logger.warning(f"[SIMILARITY] User question to general similarity score: {sim}")
-        # logger.warning(f"[SIMILARITY] User question to general similarity score: {sim}")
-        # logger.warning(f"[SIMILARITY] User question to general similarity score: {sim}")
-        return sim > 0.71
+    def extract_citations(self, source_nodes: list, max_citations: Optional[int] = None) -> List[Citation]:
+        """
+        Extracts the deduplicated, ranked source files and pages cited by a response.
+
+        Args:
+            source_nodes (list): The source nodes of the response.
+            max_citations (int, optional): The maximum number of citations returned. Defaults to all.
+
+        Returns:
+            List[Citation]: The citations, best first, with paths resolved through the source catalog.
+        """
+        return extract_citations(source_nodes, catalog=self._source_catalog, max_citations=max_citations)
 
     def check_if_retrieval_failed(self, response: str) -> bool:
         """
@@ -291,75 +564,562 @@ class Pipeline:
         Returns:
             bool: True if the response is a failure, False otherwise.
         """
-        # if self.fail_embeds is None:
-        #     self.fail_embeds = self._embed_model.get_agg_embedding_from_queries(fail_ans_templates)
-        import time
-        strt = time.time()
-        user_embeds = self._embed_model.get_agg_embedding_from_queries([response])
-        sim = self._embed_model.similarity(self.fail_embeds, user_embeds)
-        end = time.time()
-        print("TIME: ", end-strt)
-        logger.warning(f"[SIMILARITY] User response to failure similarity score: {sim}")
-        # logger.warning(f"[SIMILARITY] User response to failure similarity score: {sim}")
-        # logger.warning(f"[SIMILARITY] User response to failure similarity score: {sim}")
-        # logger.warning(f"[SIMILARITY] User response to failure similarity score: {sim}")
-        return sim > 0.7
+        return self._is_failure_embedding(self._embed_model.get_agg_embedding_from_queries([response]))
+
+    async def acheck_if_retrieval_failed(self, response: str) -> bool:
+        """
+        Async counterpart of check_if_retrieval_failed.
+        """
+        return self._is_failure_embedding(await self._embed_model.aget_agg_embedding_from_queries([response]))
 
     # ---- ---- ---- ---- ---- <
     # > Private Methods
     # ---- ---- ---- ---- ---- <
         
+    def _is_failure_embedding(self, user_embeds: List[float]) -> bool:
+        sim = self._embed_model.similarity(self.fail_embeds, user_embeds)
+        logger.warning(f"[SIMILARITY] User response to failure similarity score: {sim}")
+        return sim > 0.7
+
     # FIXME: parser_type should be a part of the configuration
-    def _load_data(self, *, source_path, parser_type: str) -> Dict[str, List[Document]]:
+    def _load_data(self, *, source_path, parser_type: str, input_files: Optional[List[PosixPath]] = None) -> Dict[str, List[Document]]:
         logger.warning(f"[LOADING DATA] Loading data using parser type: {parser_type}")
-        documents: dict[str, list[Document]]= load_documents(source_path=source_path, parser_type=parser_type)
+        documents: dict[str, list[Document]]= load_documents(
+            source_path=source_path,
+            parser_type=parser_type,
+            input_files=input_files,
+            cache=self._parse_store,
+            parse_workers=self._index_conf.parse_workers or 4,
+        )
         return documents
 
-    def _prepare_multiple_index(self, index_names: list[str], index_complete_path: PosixPath, folder_complete_path: PosixPath, use_existing_index: Optional[bool] = True, parser_type: Optional[str] = "base") -> Dict[str, VectorStoreIndex]:
+    def _prepare_multiple_index(self, index_names: list[str], index_complete_path: PosixPath, folder_complete_path: PosixPath, use_existing_index: Optional[bool] = True, parser_type: Optional[str] = "base", update_on_change: Optional[bool] = False) -> Dict[str, VectorStoreIndex]:
         """
         Prepares multiple indexes, one for each key in the documents dictionary.
+
+        Folder indexes are built or loaded in a bounded worker pool, a folder which fails
+        is logged and skipped so that the remaining indexes are still served.
         """
+        assert index_names, "No folder indexes are configured."
+        max_workers = min(self._index_conf.build_workers or 4, len(index_names))
+        logger.warning(f"[INITIALIZATION] Preparing {len(index_names)} indexes using {max_workers} workers.")
         indexes = {}
-        for index in index_names:
-            folder_name = index.get("folder", None)
-            index_name = index.get("index_name", None)
-            assert folder_name is not None, "Folder name is missing."
-            assert index_name is not None, "Index name is missing." 
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="index-build") as executor:
+            futures = {
+                executor.submit(
+                    self._prepare_folder_index,
+                    index_conf=index,
+                    index_complete_path=index_complete_path,
+                    folder_complete_path=folder_complete_path,
+                    use_existing_index=use_existing_index,
+                    parser_type=parser_type,
+                    update_on_change=update_on_change,
+                ): index.get("index_name", None)
+                for index in index_names
+            }
+            for future in as_completed(futures):
+                index_name = futures[future]
+                try:
+                    indexes[index_name] = future.result()
+                except Exception:
+                    logger.exception(f"[INDEX ERROR] Preparation of index {index_name} failed, skipping it.")
+                    continue
+                logger.warning(f"[INDEX INFO] {len(indexes)}/{len(futures)} indexes ready. WORKING WITH INDEXES: \n{indexes.keys()}")
+
+        assert indexes, "No indexes were created."
+        logger.info(f"[EMBED CACHE] Embedding cache statistics: {self._embed_model.stats()}")
+        return indexes
+
+    def _transform_documents(self, docs: List[Document]) -> list:
+        nodes = transform_documents(
+            docs,
+            llm=self._metadata_llm,
+            conf=self._parser_conf,
+            cache=self._extractor_store,
+            num_workers=self._extraction_conf.num_workers,
+        )
+        logger.info(f"[EXTRACTION] Metadata LLM token usage: {self._metadata_llm.stats()}")
+        return nodes
+
+    def _load_metadata_llm(self) -> ThrottledLLM:
+        """
+        Loads the LLM running the metadata extractors, falling back to the chat LLM if none is configured.
+        """
+        metadata_llm = self._client.load_metadata_llm()
+        metadata_llm_conf = self._client_conf.models.get("metadata_llm", None)
+        if metadata_llm is None:
+            logger.warning("[EXTRACTION] No metadata_llm is configured, extracting metadata with the chat LLM.")
+            metadata_llm = self._llm
+            metadata_llm_conf = self._client_conf.models.get("llm")
+        vendor = metadata_llm_conf.client
+        return ThrottledLLM(
+            metadata_llm,
+            vendor=vendor,
+            requests_per_minute=self._extraction_conf.requests_per_minute.get(vendor, 0),
+            token_budget=self._extraction_conf.token_budget,
+        )
 
+    def _wrap_embed_model_with_cache(self, embed_model):
+        """
+        Installs the persistent embedding cache in front of the vendor embedding model.
+        """
+        embed_conf = self._client_conf.models.get("embed", None)
+        assert embed_conf is not None, "Embedding configuration is missing."
+        store = DiskStore(
+            Path(self._cache_conf.path) / "embeddings.sqlite",
+            max_entries=self._cache_conf.embedding_max_entries,
+        )
+        logger.info(f"[EMBED CACHE] Using embedding cache with {len(store)} entries.")
+        return CachedEmbedding(
+            embed_model,
+            store=store,
+            vendor=embed_conf.client,
+            model_prefix=embed_conf.prefix,
+            offload_async=not self._client.embed_model_supports_async,
+        )
+
+    def _prepare_folder_index(self, index_conf: Dict[str, str], index_complete_path: PosixPath, folder_complete_path: PosixPath, use_existing_index: Optional[bool] = True, parser_type: Optional[str] = "base", update_on_change: Optional[bool] = False) -> VectorStoreIndex:
+        """
+        Builds a new index for a single folder or loads the existing one from the vector store.
+
+        A folder of a single index is a slice of the shared index, it exists once its manifest does.
+        """
+        folder_name = index_conf.get("folder", None)
+        index_name = index_conf.get("index_name", None)
+        assert folder_name is not None, "Folder name is missing."
+        assert index_name is not None, "Index name is missing." 
+        vector_index_name = self._vector_index_name(index_name)
+        tags = self._document_tags(index_conf)
+
+        start_time = time.perf_counter()
+        folder_complete_path_per_key = folder_complete_path / folder_name
+        manifest = IndexManifest.load(
+            manifest_path=index_complete_path / f"{index_name}.manifest.json",
+            folder_path=folder_complete_path_per_key,
+        )
+        sparse_index = SparseIndex.load(index_complete_path / f"{index_name}.sparse.npz") if self._hybrid_conf.enabled else None
+        if vector_index_name != index_name:
+            index_exists_in_pinecone = manifest.exists
+        else:
             index_exists_in_pinecone = self._vector_db_client.index_exists(index_name=index_name)
-            if use_existing_index and index_exists_in_pinecone:
-                logger.warning("[INITIALIZATION] Utilizing the existing indexes.")
-                vector_store = self._vector_db_client.get_existing_vstore(index_name)
+        if use_existing_index and index_exists_in_pinecone:
+            logger.warning(f"[INITIALIZATION] Utilizing the existing index {index_name}.")
+            vector_store = self._vector_db_client.get_existing_vstore(vector_index_name)
+            index = VectorStoreIndex.from_vector_store(vector_store)
+            resume = not manifest.complete
+            if resume:
+                logger.warning(f"[RESUME] Index {index_name} was not completely built, resuming the build.")
+            if update_on_change or resume:
+                self._update_index_on_change(index, index_name=index_name, manifest=manifest, folder_path=folder_complete_path_per_key, parser_type=parser_type, sparse_index=sparse_index, tags=tags)
+            if sparse_index is not None and not sparse_index.exists:
+                logger.warning(f"[SPARSE] No sparse index found for {index_name}, rebuild the index to enable hybrid retrieval.")
+                sparse_index = None
+            logger.warning(f"[INITIALIZATION COMPLETE] Initialization of index {index_name} complete in {time.perf_counter() - start_time:.1f}s.")
+        else:
+            logger.warning(f"[CREATION] Commencing creation of index {index_name}.")
+
+            # FIXME: This should be taken from the configuration
+            delete_index = False
+            if delete_index:
+                self._vector_db_client.delete_index(index_name=index_name)
+
+            if vector_index_name != index_name:
+                vector_store = self._vector_db_client.get_existing_vstore(vector_index_name)
+                # Vectors of an earlier build of the folder would otherwise stay in the shared index.
+                stale_node_ids = [node_id for relative_path in manifest.files for node_id in manifest.node_ids(relative_path)]
+                if stale_node_ids:
+                    self._vector_db_client.delete_vectors(index_name=vector_index_name, ids=stale_node_ids)
+            else:
+                vector_store = self._vector_db_client.create_new_vstore(index_name=index_name, dim=self._embedding_dim())
+            # Until the build completes the index is never served, a rerun resumes it instead.
+            manifest.reset()
+            manifest.save()
+            current_hashes = manifest.scan()
+            if self._ingestion_conf.streaming:
+                logger.info(f"[CREATION] {index_name}: streaming {folder_complete_path_per_key} into the index.")
+                self._stream_into_vector_store(
+                    index_name,
+                    manifest=manifest,
+                    hashes=current_hashes,
+                    folder_path=folder_complete_path_per_key,
+                    parser_type=parser_type,
+                    sparse_index=sparse_index,
+                    tags=tags,
+                )
                 index = VectorStoreIndex.from_vector_store(vector_store)
-                logger.warning("[INITIALIZATION COMPLETE] Initialization of existing indexes complete.")
             else:
-                logger.warning("[CREATION] Commencing new indexes creation.")
-
-                # FIXME: This should be taken from the configuration
-                delete_index = False
-                if delete_index:
-                    self._vector_db_client.delete_index(index_name=index_name)
-
-                vector_store = self._vector_db_client.create_new_vstore(index_name=index_name, dim=768)
-                storage_context = StorageContext.from_defaults(vector_store=vector_store)
-                folder_complete_path_per_key = folder_complete_path / folder_name
-                docs = self._load_data(source_path=folder_complete_path_per_key, parser_type=parser_type)
-                nodes = transform_documents(docs, llm=self._llm, conf=self._parser_conf)
-                index = VectorStoreIndex(
-                    nodes,
-                    storage_context=storage_context,
-                    use_async=True,
-                    show_progress=True,
+                docs = list(self._tag_documents(self._load_data(source_path=folder_complete_path_per_key, parser_type=parser_type), tags))
+                logger.info(f"[CREATION] {index_name}: loaded {len(docs)} documents.")
+                nodes = self._transform_documents(docs)
+                logger.info(f"[CREATION] {index_name}: extracted {len(nodes)} nodes, embedding and upserting.")
+                manifest.journal_nodes(self._group_node_ids(manifest, nodes, defaultdict(list)))
+                self._embed_nodes(nodes)
+                self._upsert_nodes(vector_index_name, nodes)
+                index = VectorStoreIndex.from_vector_store(vector_store)
+                self._record_nodes_in_manifest(manifest, nodes=nodes, hashes=current_hashes)
+                if sparse_index is not None:
+                    sparse_index.add_nodes(nodes)
+            manifest.mark_complete()
+            self._checkpoint(vector_index_name, manifest, sparse_index)
+            self._invalidate_answers(index_name)
+            logger.warning(f"[CREATION COMPLETE] Index {index_name} has been created in {time.perf_counter() - start_time:.1f}s.")
+        if sparse_index is not None:
+            self._sparse_indexes[index_name] = sparse_index
+        return index
+
+    def _stream_into_vector_store(self, index_name: str, manifest: IndexManifest, hashes: Dict[str, str], folder_path: PosixPath, parser_type: Optional[str] = "base", sparse_index: Optional[SparseIndex] = None, input_files: Optional[List[PosixPath]] = None, tags: Optional[Dict[str, str]] = None) -> int:
+        """
+        Streams the files through extraction, embedding and upsert, the nodes are never held in memory all at once.
+
+        Node identifiers are journaled before every upsert and recorded as partial files after it,
+        files are recorded with their hash once completely upserted. The manifest and the sparse
+        index are checkpointed every `checkpoint_seconds`, an interrupted build resumes from there.
+        """
+        vector_index_name = self._vector_index_name(index_name)
+        node_ids_per_file = defaultdict(list)
+        completed = set()
+        last_checkpoint = time.perf_counter()
+
+        def before_upsert(nodes: list) -> None:
+            manifest.journal_nodes(self._group_node_ids(manifest, nodes, defaultdict(list)))
+
+        def on_upserted(nodes: list) -> None:
+            nonlocal last_checkpoint
+            for relative_path, node_ids in self._group_node_ids(manifest, nodes, defaultdict(list)).items():
+                node_ids_per_file[relative_path].extend(node_ids)
+                manifest.record_file(relative_path, None, node_ids=node_ids_per_file[relative_path])
+            if sparse_index is not None:
+                sparse_index.add_nodes(nodes)
+            if time.perf_counter() - last_checkpoint >= self._ingestion_conf.checkpoint_seconds:
+                self._checkpoint(vector_index_name, manifest, sparse_index)
+                last_checkpoint = time.perf_counter()
+
+        def on_file_complete(file_path: str) -> None:
+            relative_path = manifest.relative_path(file_path)
+            if relative_path in hashes:
+                manifest.record_file(relative_path, hashes[relative_path], node_ids=node_ids_per_file.pop(relative_path, []))
+                completed.add(relative_path)
+
+        documents = self._tag_documents(stream_documents(
+            source_path=folder_path,
+            parser_type=parser_type,
+            input_files=input_files,
+            cache=self._parse_store,
+            parse_workers=self._index_conf.parse_workers or 4,
+        ), tags)
+        ingestion = StreamingIngestion(
+            transform=self._transform_documents,
+            embed_model=self._embed_model,
+            upsert=lambda nodes: self._upsert_nodes(vector_index_name, nodes),
+            before_upsert=before_upsert,
+            on_upserted=on_upserted,
+            on_file_complete=on_file_complete,
+            queue_size=self._ingestion_conf.queue_size,
+            document_batch_size=self._ingestion_conf.document_batch_size,
+            transform_workers=self._ingestion_conf.transform_workers,
+            upsert_batch_size=self._ingestion_conf.upsert_batch_size,
+        )
+        node_count = ingestion.run(documents)
+        unfinished = len(hashes) - len(completed)
+        if unfinished:
+            logger.warning(f"[INGEST] {unfinished} files were not completely ingested and will be retried on the next run.")
+        logger.info(f"[INGEST] Upserted {node_count} nodes from {folder_path}.")
+        return node_count
+
+    def _embed_nodes(self, nodes: list) -> None:
+        """
+        Embeds the nodes in place ahead of their upsert, nodes already carrying an embedding are kept as is.
+        """
+        embeddings = embed_nodes(nodes, self._embed_model, show_progress=True)
+        for node in nodes:
+            node.embedding = embeddings[node.node_id]
+
+    def _upsert_nodes(self, index_name: str, nodes: list) -> None:
+        """
+        Upserts embedded nodes with the batched, concurrent and retried upserts of the vector database client.
+        """
+        self._vector_db_client.upsert_nodes(
+            index_name,
+            nodes,
+            batch_size=self._ingestion_conf.upsert_request_size,
+            max_workers=self._ingestion_conf.upsert_workers,
+            max_retries=self._ingestion_conf.upsert_max_retries,
+            backoff_seconds=self._ingestion_conf.upsert_backoff_seconds,
+        )
+
+    def _checkpoint(self, index_name: str, manifest: IndexManifest, sparse_index: Optional[SparseIndex] = None) -> None:
+        """
+        Persists the build progress, the vectors and the sparse index first as the manifest is the commit point.
+        """
+        self._vector_db_client.persist(index_name)
+        if sparse_index is not None:
+            sparse_index.save()
+        manifest.save()
+
+    def _update_index_on_change(self, index: VectorStoreIndex, index_name: str, manifest: IndexManifest, folder_path: PosixPath, parser_type: Optional[str] = "base", sparse_index: Optional[SparseIndex] = None, tags: Optional[Dict[str, str]] = None) -> None:
+        """
+        Brings an existing index in sync with its source folder, only the files which were added,
+        changed or deleted since the manifest was recorded are parsed, extracted and embedded.
+        """
+        vector_index_name = self._vector_index_name(index_name)
+        current_hashes = manifest.scan()
+        if not manifest.exists:
+            logger.warning(
+                f"[UPDATE] No manifest found for {index_name}, assuming the index is in sync with the source folder. "
+                "Vectors of files changed later on cannot be cleaned up until the index is rebuilt."
+            )
+            for relative_path, sha256 in current_hashes.items():
+                manifest.record_file(relative_path, sha256, node_ids=[])
+            manifest.save()
+            return
+
+        if sparse_index is not None and not sparse_index.exists and not manifest.complete:
+            # The build was interrupted before its first checkpoint saved the sparse index, at most
+            # `checkpoint_seconds` of work. The files recorded so far are ingested again, so that the
+            # sparse index covers the whole folder before the index is marked complete.
+            logger.warning(f"[RESUME] No sparse index was saved for {index_name}, re-ingesting the {len(manifest.files)} files recorded so far.")
+            stale_node_ids = [node_id for relative_path in manifest.files for node_id in manifest.forget_file(relative_path)]
+            if stale_node_ids:
+                self._vector_db_client.delete_vectors(index_name=vector_index_name, ids=stale_node_ids)
+
+        diff = manifest.diff(current_hashes)
+        if not diff.has_changes:
+            logger.info(f"[UPDATE] Index {index_name} is up to date with {folder_path}.")
+            if not manifest.complete:
+                manifest.mark_complete()
+                manifest.save()
+            return
+        logger.warning(
+            f"[UPDATE] Updating index {index_name}: "
+            f"{len(diff.added)} added, {len(diff.changed)} changed, {len(diff.deleted)} deleted files."
+        )
+
+        manifest.mark_incomplete()
+        stale_node_ids = [node_id for relative_path in diff.to_remove for node_id in manifest.forget_file(relative_path)]
+        if stale_node_ids:
+            self._vector_db_client.delete_vectors(index_name=vector_index_name, ids=stale_node_ids)
+        # A sparse index which was never built is only built when every file is ingested below,
+        # e.g. on a resumed build, it would otherwise cover the changed files only.
+        if sparse_index is not None and not sparse_index.exists and manifest.files:
+            sparse_index = None
+        if sparse_index is not None:
+            sparse_index.delete_nodes(stale_node_ids)
+
+        if diff.to_index:
+            input_files = [manifest.absolute_path(relative_path) for relative_path in diff.to_index]
+            changed_hashes = {relative_path: current_hashes[relative_path] for relative_path in diff.to_index}
+            if self._ingestion_conf.streaming:
+                self._stream_into_vector_store(
+                    index_name,
+                    manifest=manifest,
+                    hashes=changed_hashes,
+                    folder_path=folder_path,
+                    parser_type=parser_type,
+                    sparse_index=sparse_index,
+                    input_files=input_files,
+                    tags=tags,
                 )
-                logger.warning("[CREATION COMPLETE] New indexes have been created.")
-            indexes[index_name] = index
-            logger.warning(f"[INDEX INFO] WORKING WITH INDEXES: \n{indexes.keys()}")
+            else:
+                docs = list(self._tag_documents(self._load_data(source_path=folder_path, parser_type=parser_type, input_files=input_files), tags))
+                nodes = self._transform_documents(docs)
+                manifest.journal_nodes(self._group_node_ids(manifest, nodes, defaultdict(list)))
+                self._embed_nodes(nodes)
+                self._upsert_nodes(vector_index_name, nodes)
+                if sparse_index is not None:
+                    sparse_index.add_nodes(nodes)
+                self._record_nodes_in_manifest(manifest, nodes=nodes, hashes=changed_hashes)
+        manifest.mark_complete()
+        self._checkpoint(vector_index_name, manifest, sparse_index)
+        self._invalidate_answers(index_name)
+        logger.warning(f"[UPDATE COMPLETE] Index {index_name} has been updated.")
+
+    def _record_nodes_in_manifest(self, manifest: IndexManifest, nodes: list, hashes: Dict[str, str]) -> None:
+        node_ids_per_file = self._group_node_ids(manifest, nodes, defaultdict(list))
+        for relative_path, sha256 in hashes.items():
+            manifest.record_file(relative_path, sha256, node_ids=node_ids_per_file.get(relative_path, []))
+
+    @staticmethod
+    def _group_node_ids(manifest: IndexManifest, nodes: list, node_ids_per_file: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        for node in nodes:
+            relative_path = manifest.relative_path(node.metadata.get("file_path", ""))
+            if relative_path is not None:
+                node_ids_per_file[relative_path].append(node.node_id)
+        return node_ids_per_file
+
+    def _invalidate_answers(self, index_name: str) -> None:
+        """
+        Drops cached answers which may have been synthesized from the previous content of the index.
+        """
+        if self._answer_cache is None:
+            return
+        self._answer_cache.invalidate(index_name)
+        self._answer_cache.invalidate("all")
+        for category in self._routing_conf.categories:
+            if self._category_route(category)[0] in (index_name, "all"):
+                self._answer_cache.invalidate(self.answer_scope(category))
+
+    def _prepare_single_index(self, index_names: list[str], index_complete_path: PosixPath, folder_complete_path: PosixPath, use_existing_index: Optional[bool] = True, parser_type: Optional[str] = "base", update_on_change: Optional[bool] = False) -> Dict[str, VectorStoreIndex]:
+        """
+        Prepares one index in the vector store shared by every folder, instead of one index per folder.
 
-        assert indexes, "No indexes were created."
+        The nodes of each folder carry its "folder" (and optional "tenant") metadata, the retrievers of
+        an index name filter on it in the vector store. Every folder keeps its own manifest and sparse
+        index and is built, resumed and updated as with multiple indexes.
+        """
+        single_index_name = self._index_conf.single_index_name
+        assert single_index_name is not None, "Single index name is missing."
+        if not self._vector_db_client.index_exists(index_name=single_index_name):
+            logger.warning(f"[CREATION] Creating the single index {single_index_name} shared by {len(index_names)} folders.")
+            self._vector_db_client.create_new_vstore(index_name=single_index_name, dim=self._embedding_dim())
+        for index in index_names:
+            self._vector_index_names[index.get("index_name", None)] = single_index_name
+
+        indexes = self._prepare_multiple_index(
+            index_names=index_names,
+            index_complete_path=index_complete_path,
+            folder_complete_path=folder_complete_path,
+            use_existing_index=use_existing_index,
+            parser_type=parser_type,
+            update_on_change=update_on_change,
+        )
+        self._shared_index = VectorStoreIndex.from_vector_store(self._vector_db_client.get_existing_vstore(single_index_name))
         return indexes
 
-    def _prepare_single_index(self, documents: List[Document], storage_context: StorageContext) -> VectorStoreIndex:
-        raise NotImplementedError("Single index is not yet implemented.")
+    def _category_route(self, category: str) -> Tuple[str, Optional[Dict[str, str]]]:
+        """
+        The index identifier and metadata filters of a category, categories which are not configured search the default index.
+        """
+        route = self._routing_conf.categories.get(category, None) or dict()
+        return route.get("index_identifier", self._routing_conf.default_index_identifier), route.get("filters", None)
+
+    def _embedding_dim(self) -> int:
+        """
+        The dimension of the embedding model, new vector stores are sized from it.
+        """
+        if self._embed_dim is None:
+            self._embed_dim = len(self._embed_model.get_text_embedding("dim"))
+            logger.info(f"[INITIALIZATION] Embedding dimension: {self._embed_dim}")
+        return self._embed_dim
+
+    def _vector_index_name(self, index_name: str) -> str:
+        return self._vector_index_names.get(index_name, index_name)
+
+    def _folder_conf(self, index_name: str) -> Dict[str, str]:
+        for index in self._index_conf.folder_indexes:
+            if index.get("index_name", None) == index_name:
+                return index
+        raise ValueError(f"Invalid index identifier: {index_name}")
+
+    @staticmethod
+    def _document_tags(index_conf: Dict[str, str]) -> Dict[str, str]:
+        """
+        Metadata identifying the slice of a folder within a single index, the optional tenant groups folders.
+        """
+        tags = {"folder": index_conf.get("folder")}
+        if index_conf.get("tenant", None) is not None:
+            tags["tenant"] = index_conf.get("tenant")
+        return tags
+
+    @staticmethod
+    def _tag_documents(documents: Iterable[Document], tags: Optional[Dict[str, str]] = None) -> Iterator[Document]:
+        """
+        Adds the tags to the metadata of the documents, they are inherited by the nodes but neither embedded nor shown to the LLM.
+        """
+        for document in documents:
+            if tags:
+                document.metadata.update(tags)
+                document.excluded_embed_metadata_keys = list(dict.fromkeys(document.excluded_embed_metadata_keys + list(tags)))
+                document.excluded_llm_metadata_keys = list(dict.fromkeys(document.excluded_llm_metadata_keys + list(tags)))
+            yield document
+
+    def _resolve_index_names(self, index_identifier: str) -> List[str]:
+        """
+        Resolves the index identifier against the configured folder indexes, "all" resolves to every index.
+        """
+        configured_index_names = [index.get("index_name", None) for index in self._index_conf.folder_indexes]
+        if index_identifier == "all":
+            return configured_index_names
+        if index_identifier not in configured_index_names:
+            raise ValueError(f"Invalid index identifier: {index_identifier}")
+        return [index_identifier]
+
+    def _spawn_retriever(self, index_identifier: str, similarity_top_k: Optional[int] = 5, filters: Optional[Dict[str, str]] = None) -> BaseRetriever:
+        """
+        Spawns the retriever of an index identifier, with metadata filters the sparse retrieval is skipped as it cannot apply them.
+        """
+        index_names = []
+        for index_name in self._resolve_index_names(index_identifier):
+            if index_name not in self._indexes and index_identifier == "all":
+                logger.warning(f"[RETRIEVAL] Index {index_name} is not available, it is left out of the query.")
+                continue
+            assert index_name in self._indexes, f"Index {index_name} is missing."
+            index_names.append(index_name)
+
+        if self._shared_index is not None:
+            # A single query over the shared index, restricted to the folders by the vector store.
+            dense_retrievers = {"shared": self._wrap_dense_retriever(self._dense_retriever(index_names, similarity_top_k=similarity_top_k, filters=filters))}
+        else:
+            dense_retrievers = {
+                index_name: self._wrap_dense_retriever(self._dense_retriever([index_name], similarity_top_k=similarity_top_k, filters=filters))
+                for index_name in index_names
+            }
+        sparse_retrievers = {
+            index_name: SparseRetriever(self._sparse_indexes[index_name], similarity_top_k=self._hybrid_conf.sparse_top_k)
+            for index_name in index_names
+            if index_name in self._sparse_indexes and not filters
+        }
+
+        # Dense and sparse hits are merged across the indexes on their raw scores before the ranks are fused,
+        # fusing per index would rank the best hit of every index alike.
+        retriever = self._merge_retrievers(dense_retrievers, similarity_top_k=similarity_top_k, higher_is_better=self._vector_db_client.higher_is_better)
+        if sparse_retrievers:
+            sparse_retriever = self._merge_retrievers(sparse_retrievers, similarity_top_k=self._hybrid_conf.sparse_top_k, higher_is_better=True)
+            retriever = HybridRetriever(retriever, sparse_retriever, similarity_top_k=similarity_top_k, rrf_k=self._hybrid_conf.rrf_k)
+        return retriever
+
+    def _merge_retrievers(self, retrievers: Dict[str, BaseRetriever], similarity_top_k: int, higher_is_better: bool) -> BaseRetriever:
+        if len(retrievers) == 1:
+            return next(iter(retrievers.values()))
+        return MultiIndexRetriever(retrievers, similarity_top_k=similarity_top_k, embed_model=self._embed_model, higher_is_better=higher_is_better)
+
+    def _dense_retriever(self, index_names: List[str], similarity_top_k: Optional[int] = 5, filters: Optional[Dict[str, str]] = None) -> BaseRetriever:
+        """
+        Retriever over the vectors of the index names, the metadata filters are pushed down to the vector store.
+
+        A single index is restricted to the folders of the index names, unless every folder is requested.
+        """
+        metadata_filters = [MetadataFilter(key=key, value=value) for key, value in (filters or dict()).items()]
+        if self._shared_index is None:
+            assert len(index_names) == 1, "Every index of multiple indexes is retrieved from separately."
+            index = self._indexes[index_names[0]]
+        else:
+            index = self._shared_index
+            folders = [self._folder_conf(index_name).get("folder") for index_name in index_names]
+            if len(folders) == 1:
+                metadata_filters.append(MetadataFilter(key="folder", value=folders[0]))
+            elif len(folders) < len(self._index_conf.folder_indexes):
+                metadata_filters.append(MetadataFilter(key="folder", value=folders, operator=FilterOperator.IN))
+        return index.as_retriever(
+            similarity_top_k=similarity_top_k,
+            filters=MetadataFilters(filters=metadata_filters) if metadata_filters else None,
+        )
+
+    def _wrap_dense_retriever(self, retriever: BaseRetriever) -> BaseRetriever:
+        if not self._vector_db_client.supports_async:
+            retriever = ThreadedRetriever(retriever)
+        if self._retrieval_gate is not None:
+            # Gated per index, scores of different indexes are only comparable before normalization.
+            retriever = GatedRetriever(retriever, gate=self._retrieval_gate)
+        return retriever
+
+    def _retrieval_top_k(self) -> int:
+        """
+        With a reranker the retrievers over-fetch candidates, only the reranked best reach the LLM.
+        """
+        return self._rerank_conf.candidates_top_k if self._reranker is not None else 5
+
+    def _node_postprocessors(self) -> list:
+        return [self._reranker] if self._reranker is not None else []
 
     def _update_engine_prompt(self, engine, prompt: Optional[str] ="generic", update_field: Optional[str]='response_synthesizer:summary_template') -> None:
         refined_prompt_template = None
@@ -379,8 +1139,29 @@ class Pipeline:
             {update_field: refined_prompt_template},
         )
 
-    def _prepare_qdrant(self) -> None:
-        pass
+    def _load_vector_db_client(self):
+        """
+        Resolves the vector store backend of the index configuration, both backends share the same surface.
+
+        The local backends need faiss, installed with the `local` extra, and are only imported when selected.
+        """
+        if self._index_conf.vector_store == "faiss":
+            from client.vendor.faiss import FaissClient
+
+            vector_db_client = FaissClient(Path(self._index_conf.path) / "faiss")
+            vector_db_client.connect()
+            logger.info(f"[VECTOR STORE] Using the local FAISS vector store under {self._index_conf.path}.")
+            return vector_db_client
+        if self._index_conf.vector_store == "ann":
+            from client.vendor.ann import AnnClient
+
+            vector_db_client = AnnClient(Path(self._index_conf.path) / "ann", **vars(self._ann_conf))
+            vector_db_client.connect()
+            logger.info(f"[VECTOR STORE] Using the local ANN vector store under {self._index_conf.path}: {vars(self._ann_conf)}")
+            return vector_db_client
+        if self._index_conf.vector_store == "pinecone":
+            return self._client.load_pinecone_client()
+        raise ValueError(f"Invalid vector store: {self._index_conf.vector_store}")
 
 # import faiss
 # import numpy as np
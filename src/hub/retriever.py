@@ -0,0 +1,157 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from loguru import logger
+
+from llama_index.core import Settings
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+# Worker threads shared by every MultiIndexRetriever, created on the first synchronous retrieval
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix="retriever")
+        return _executor
+
+
+class MultiIndexRetriever(BaseRetriever):
+    """
+    Retrieves from several folder indexes concurrently and merges the per-index top-k.
+
+    Every index is queried with the same embedding model and metric, so the raw scores are merged
+    as they are. Scores of stores where lower is better (euclidean distances) are negated, the
+    merged nodes are always ranked with higher is better.
+    """
+
+    def __init__(
+        self,
+        retrievers: Dict[str, BaseRetriever],
+        similarity_top_k: Optional[int] = 5,
+        embed_model: Optional[BaseEmbedding] = None,
+        higher_is_better: Optional[bool] = True,
+    ) -> None:
+        """
+        Initializes the MultiIndexRetriever object.
+
+        Args:
+            retrievers (Dict[str, BaseRetriever]): The retrievers keyed by index name.
+            similarity_top_k (int, optional): The number of merged nodes returned. Defaults to 5.
+            embed_model (BaseEmbedding, optional): The model used to embed the query once for all indexes. Defaults to Settings.embed_model.
+            higher_is_better (bool, optional): Whether higher raw scores of the retrievers are better. Defaults to True.
+
+        Returns:
+            None
+        """
+        assert retrievers, "No retrievers were provided."
+        super().__init__()
+        self._retrievers = retrievers
+        self._similarity_top_k = similarity_top_k
+        self._embed_model = embed_model or Settings.embed_model
+        self._higher_is_better = higher_is_better
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self._embed_model.get_agg_embedding_from_queries(query_bundle.embedding_strs)
+        futures = {
+            index_name: _shared_executor().submit(retriever.retrieve, query_bundle)
+            for index_name, retriever in self._retrievers.items()
+        }
+        results = {}
+        for index_name, future in futures.items():
+            try:
+                results[index_name] = future.result()
+            except Exception as error:
+                logger.error(f"[RETRIEVAL] Retrieval from {index_name} failed: {error}")
+        return self._merge(results)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = await self._embed_model.aget_agg_embedding_from_queries(query_bundle.embedding_strs)
+        index_names = list(self._retrievers.keys())
+        responses = await asyncio.gather(
+            *[self._retrievers[index_name].aretrieve(query_bundle) for index_name in index_names],
+            return_exceptions=True,
+        )
+        results = {}
+        for index_name, response in zip(index_names, responses):
+            if isinstance(response, Exception):
+                logger.error(f"[RETRIEVAL] Retrieval from {index_name} failed: {response}")
+            else:
+                results[index_name] = response
+        return self._merge(results)
+
+    def _merge(self, results: Dict[str, List[NodeWithScore]]) -> List[NodeWithScore]:
+        sign = 1.0 if self._higher_is_better else -1.0
+        merged = [
+            NodeWithScore(node=node.node, score=sign * node.score if node.score is not None else None)
+            for nodes in results.values()
+            for node in nodes
+        ]
+        merged.sort(key=lambda node: node.score if node.score is not None else -float("inf"), reverse=True)
+        logger.info(f"[RETRIEVAL] Merged {len(merged)} nodes from {len(results)} indexes.")
+        return merged[:self._similarity_top_k]
+
+
+class ThreadedRetriever(BaseRetriever):
+    """
+    Runs the async retrieval of a retriever whose vector store only queries synchronously in a worker thread,
+    so that awaiting it does not block the event loop.
+    """
+
+    def __init__(self, retriever: BaseRetriever) -> None:
+        super().__init__()
+        self._retriever = retriever
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._retriever.retrieve(query_bundle)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return await asyncio.to_thread(self._retriever.retrieve, query_bundle)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Combines a dense and a sparse retriever with reciprocal rank fusion.
+
+    Ranks, not scores, are fused: a node scores the sum of 1 / (rrf_k + rank) over the rankings it appears in.
+    The dense side decides whether there is an answer at all, when it returns nothing (e.g. rejected by the
+    retrieval gate) no sparse-only context is passed on.
+    """
+
+    def __init__(self, dense: BaseRetriever, sparse: BaseRetriever, similarity_top_k: Optional[int] = 5, rrf_k: Optional[int] = 60) -> None:
+        super().__init__()
+        self._dense = dense
+        self._sparse = sparse
+        self._similarity_top_k = similarity_top_k
+        self._rrf_k = rrf_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._fuse(self._dense.retrieve(query_bundle), self._sparse.retrieve(query_bundle))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        dense_nodes, sparse_nodes = await asyncio.gather(
+            self._dense.aretrieve(query_bundle),
+            asyncio.to_thread(self._sparse.retrieve, query_bundle),
+        )
+        return self._fuse(dense_nodes, sparse_nodes)
+
+    def _fuse(self, dense_nodes: List[NodeWithScore], sparse_nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        if not dense_nodes:
+            return []
+        fused_scores: Dict[str, float] = {}
+        nodes = {}
+        for ranking in (dense_nodes, sparse_nodes):
+            for rank, node in enumerate(ranking):
+                fused_scores[node.node.node_id] = fused_scores.get(node.node.node_id, 0.0) + 1.0 / (self._rrf_k + rank + 1)
+                nodes.setdefault(node.node.node_id, node.node)
+        ranked = sorted(fused_scores.items(), key=lambda item: item[1], reverse=True)[:self._similarity_top_k]
+        logger.debug(f"[RETRIEVAL] Fused {len(dense_nodes)} dense and {len(sparse_nodes)} sparse nodes into {len(ranked)}.")
+        return [NodeWithScore(node=nodes[node_id], score=score) for node_id, score in ranked]
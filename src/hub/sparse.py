@@ -0,0 +1,223 @@
+import os
+import re
+import json
+import math
+import threading
+import numpy as np
+from array import array
+from pathlib import PosixPath, Path
+from typing import Dict, List, Optional
+from loguru import logger
+from cache import DiskStore
+
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
+from llama_index.core.storage.docstore.utils import doc_to_json, json_to_doc
+
+# Clause numbers such as 4.2.1 are kept as one term, everything else is split on non-word characters.
+TOKEN_PATTERN = re.compile(r"\d+(?:[.\-/]\d+)+|\w+", re.UNICODE)
+KEYWORDS_METADATA_KEY = "excerpt_keywords"
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class SparseIndex:
+    """
+    BM25 inverted index over the nodes of a single folder index.
+
+    Postings are kept per term as compact typed arrays (uint32 document slots, uint16 term frequencies),
+    deleted nodes are tombstoned and dropped when the index is compacted on save. The nodes themselves
+    live in a DiskStore next to the index, so that only the postings are held in memory.
+    """
+
+    def __init__(self, index_path: PosixPath, k1: Optional[float] = 1.2, b: Optional[float] = 0.75) -> None:
+        """
+        Initializes the SparseIndex object.
+
+        Args:
+            index_path (PosixPath): The path of the postings file, the node store is kept next to it.
+            k1 (float, optional): The BM25 term frequency saturation. Defaults to 1.2.
+            b (float, optional): The BM25 document length normalization. Defaults to 0.75.
+
+        Returns:
+            None
+        """
+        self._index_path = Path(index_path)
+        self._node_store = DiskStore(self._index_path.with_suffix(".nodes.sqlite"))
+        self._k1 = k1
+        self._b = b
+        self._lock = threading.Lock()
+
+        self._term_ids: Dict[str, int] = {}
+        self._postings_docs: List[array] = []
+        self._postings_tfs: List[array] = []
+        self._node_ids: List[Optional[str]] = []
+        self._slots: Dict[str, int] = {}
+        self._doc_lengths = array("I")
+        self._total_length = 0
+
+    @classmethod
+    def load(cls, index_path: PosixPath) -> 'SparseIndex':
+        """
+        Loads the index from disk, an empty index is returned if the file does not exist.
+        """
+        instance = cls(index_path)
+        if not instance._index_path.exists():
+            return instance
+        with np.load(instance._index_path, allow_pickle=False) as data:
+            offsets = data["offsets"]
+            docs, tfs = data["docs"], data["tfs"]
+            instance._term_ids = {str(term): term_id for term_id, term in enumerate(data["terms"])}
+            instance._postings_docs = [array("I", docs[offsets[i]:offsets[i + 1]].tobytes()) for i in range(len(offsets) - 1)]
+            instance._postings_tfs = [array("H", tfs[offsets[i]:offsets[i + 1]].tobytes()) for i in range(len(offsets) - 1)]
+            instance._node_ids = [str(node_id) for node_id in data["node_ids"]]
+            instance._doc_lengths = array("I", data["doc_lengths"].tobytes())
+        instance._slots = {node_id: slot for slot, node_id in enumerate(instance._node_ids)}
+        instance._total_length = sum(instance._doc_lengths)
+        logger.info(f"[SPARSE] Loaded sparse index {instance._index_path.name} with {len(instance)} nodes and {len(instance._term_ids)} terms.")
+        return instance
+
+    @property
+    def exists(self) -> bool:
+        return self._index_path.exists()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add_nodes(self, nodes: List[BaseNode]) -> None:
+        """
+        Indexes the text and the extracted keywords of the nodes, nodes already in the index are replaced.
+        """
+        self.delete_nodes([node.node_id for node in nodes if node.node_id in self._slots])
+        with self._lock:
+            for node in nodes:
+                terms = tokenize(node.get_content())
+                keywords = node.metadata.get(KEYWORDS_METADATA_KEY, None)
+                if keywords:
+                    terms += tokenize(keywords)
+                slot = len(self._node_ids)
+                self._node_ids.append(node.node_id)
+                self._slots[node.node_id] = slot
+                self._doc_lengths.append(len(terms))
+                self._total_length += len(terms)
+                frequencies: Dict[str, int] = {}
+                for term in terms:
+                    frequencies[term] = frequencies.get(term, 0) + 1
+                for term, frequency in frequencies.items():
+                    term_id = self._term_ids.get(term, None)
+                    if term_id is None:
+                        term_id = self._term_ids[term] = len(self._postings_docs)
+                        self._postings_docs.append(array("I"))
+                        self._postings_tfs.append(array("H"))
+                    self._postings_docs[term_id].append(slot)
+                    self._postings_tfs[term_id].append(min(frequency, 65535))
+        # The embeddings are not needed to answer from the stored nodes, they would dominate the store.
+        self._node_store.put_many([
+            (node.node_id, json.dumps(doc_to_json(node.copy(update={"embedding": None}))).encode("utf-8"))
+            for node in nodes
+        ])
+
+    def delete_nodes(self, node_ids: List[str]) -> None:
+        with self._lock:
+            for node_id in node_ids:
+                slot = self._slots.pop(node_id, None)
+                if slot is None:
+                    continue
+                self._node_ids[slot] = None
+                self._total_length -= self._doc_lengths[slot]
+                self._doc_lengths[slot] = 0
+        self._node_store.delete_many(node_ids)
+
+    def search(self, query: str, top_k: Optional[int] = 10) -> List[NodeWithScore]:
+        with self._lock:
+            if not self._slots:
+                return []
+            scores = np.zeros(len(self._node_ids), dtype=np.float32)
+            doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32).astype(np.float32)
+            average_length = self._total_length / len(self._slots)
+            normalization = self._k1 * (1.0 - self._b + self._b * doc_lengths / max(average_length, 1.0))
+            for term in set(tokenize(query)):
+                term_id = self._term_ids.get(term, None)
+                if term_id is None:
+                    continue
+                docs = np.frombuffer(self._postings_docs[term_id], dtype=np.uint32)
+                tfs = np.frombuffer(self._postings_tfs[term_id], dtype=np.uint16).astype(np.float32)
+                idf = math.log(1.0 + (len(self._slots) - len(docs) + 0.5) / (len(docs) + 0.5))
+                # A node appears once per term postings list, plain fancy indexing accumulates correctly.
+                scores[docs] += idf * tfs * (self._k1 + 1.0) / (tfs + normalization[docs])
+            # Tombstoned slots have a zero length but may still be referenced by postings.
+            scores[doc_lengths == 0] = 0.0
+            top_k = min(top_k, int(np.count_nonzero(scores)))
+            if top_k == 0:
+                return []
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            best = best[np.argsort(-scores[best])]
+            ranked = [(self._node_ids[slot], float(scores[slot])) for slot in best]
+
+        stored = self._node_store.get_many([node_id for node_id, _ in ranked])
+        return [
+            NodeWithScore(node=json_to_doc(json.loads(stored[node_id])), score=score)
+            for node_id, score in ranked
+            if node_id in stored
+        ]
+
+    def save(self) -> None:
+        """
+        Compacts the postings (dropping deleted nodes) and writes them atomically.
+        """
+        with self._lock:
+            self._compact()
+            offsets = np.zeros(len(self._postings_docs) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(postings) for postings in self._postings_docs])
+            terms = sorted(self._term_ids, key=self._term_ids.get)
+            self._index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._index_path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as file:
+                np.savez(
+                    file,
+                    terms=np.array(terms, dtype=str),
+                    offsets=offsets,
+                    docs=np.frombuffer(b"".join(postings.tobytes() for postings in self._postings_docs), dtype=np.uint32),
+                    tfs=np.frombuffer(b"".join(postings.tobytes() for postings in self._postings_tfs), dtype=np.uint16),
+                    node_ids=np.array(self._node_ids, dtype=str),
+                    doc_lengths=np.frombuffer(self._doc_lengths, dtype=np.uint32),
+                )
+            os.replace(tmp_path, self._index_path)
+        logger.info(f"[SPARSE] Saved sparse index {self._index_path.name} with {len(self)} nodes and {len(self._term_ids)} terms.")
+
+    def _compact(self) -> None:
+        if len(self._slots) == len(self._node_ids):
+            return
+        new_slots = np.full(len(self._node_ids), -1, dtype=np.int64)
+        node_ids, doc_lengths = [], array("I")
+        for slot, node_id in enumerate(self._node_ids):
+            if node_id is not None:
+                new_slots[slot] = len(node_ids)
+                node_ids.append(node_id)
+                doc_lengths.append(self._doc_lengths[slot])
+
+        term_ids, postings_docs, postings_tfs = {}, [], []
+        for term, term_id in self._term_ids.items():
+            docs = new_slots[np.frombuffer(self._postings_docs[term_id], dtype=np.uint32)]
+            keep = docs >= 0
+            if not keep.any():
+                continue
+            term_ids[term] = len(postings_docs)
+            postings_docs.append(array("I", docs[keep].astype(np.uint32).tobytes()))
+            postings_tfs.append(array("H", np.frombuffer(self._postings_tfs[term_id], dtype=np.uint16)[keep].tobytes()))
+
+        self._term_ids, self._postings_docs, self._postings_tfs = term_ids, postings_docs, postings_tfs
+        self._node_ids, self._doc_lengths = node_ids, doc_lengths
+        self._slots = {node_id: slot for slot, node_id in enumerate(node_ids)}
+
+
+class SparseRetriever(BaseRetriever):
+    def __init__(self, sparse_index: SparseIndex, similarity_top_k: Optional[int] = 10) -> None:
+        super().__init__()
+        self._sparse_index = sparse_index
+        self._similarity_top_k = similarity_top_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._sparse_index.search(query_bundle.query_str, top_k=self._similarity_top_k)
@@ -1,6 +1,6 @@
 import yaml
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Any
 from loguru import logger
 
@@ -11,6 +11,9 @@ class IndexConfig:
     load_existing_index_under_prefix: bool
     single_index_name: Optional[str] = None
     folder_indexes: Optional[List[Dict[str, str]]] = None
+    build_workers: Optional[int] = None
+    parse_workers: Optional[int] = None
+    vector_store: str = "pinecone"
 
 @dataclass
 class ModelConfig:
@@ -32,11 +35,76 @@ class ParserConfig:
     splitters: Dict[str, Any]
     extractors: Dict[str, Any]
 
+@dataclass
+class CacheConfig:
+    path: str = "data/cache"
+    embedding_max_entries: Optional[int] = None
+    extractor_max_entries: Optional[int] = None
+    answer_similarity_threshold: float = 0.95
+    answer_ttl_seconds: Optional[float] = 24 * 3600
+    answer_max_entries: Optional[int] = 1000
+
+@dataclass
+class RerankConfig:
+    enabled: bool = False
+    candidates_top_k: int = 20
+    top_n: int = 4
+    batch_size: int = 16
+    backend: str = "torch"
+    cache_size: int = 10_000
+
+@dataclass
+class HybridConfig:
+    enabled: bool = False
+    sparse_top_k: int = 20
+    rrf_k: int = 60
+
+@dataclass
+class ExtractionConfig:
+    num_workers: int = 4
+    requests_per_minute: Dict[str, int] = field(default_factory=dict)
+    token_budget: Optional[int] = None
+
+@dataclass
+class IngestionConfig:
+    streaming: bool = False
+    queue_size: int = 4
+    document_batch_size: int = 16
+    transform_workers: int = 2
+    upsert_batch_size: int = 1000
+    upsert_request_size: int = 100
+    upsert_workers: int = 8
+    upsert_max_retries: int = 5
+    upsert_backoff_seconds: float = 0.5
+    checkpoint_seconds: float = 30.0
+
+@dataclass
+class AnnConfig:
+    codec: str = "pq"
+    nlist: int = 256
+    nprobe: int = 16
+    pq_subvectors: int = 96
+    rescore_k: int = 64
+    train_size: int = 10000
+
+@dataclass
+class RoutingConfig:
+    users: Optional[Dict[str, str]] = None
+    default_index_identifier: str = "zahid-index"
+    categories: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
 @dataclass
 class Config:
     index: IndexConfig
     client: ClientConfig
     parser: ParserConfig
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    rerank: RerankConfig = field(default_factory=RerankConfig)
+    hybrid: HybridConfig = field(default_factory=HybridConfig)
+    extraction: ExtractionConfig = field(default_factory=ExtractionConfig)
+    ingestion: IngestionConfig = field(default_factory=IngestionConfig)
+    ann: AnnConfig = field(default_factory=AnnConfig)
+    routing: RoutingConfig = field(default_factory=RoutingConfig)
 
 def read_configuration(yaml_file_path: Path) -> Config:
     with open(yaml_file_path, 'r') as file:
@@ -48,7 +116,10 @@ def read_configuration(yaml_file_path: Path) -> Config:
         index_type=yaml_data['index']['type'],
         load_existing_index_under_prefix=yaml_data['index']['load_existing_index_under_prefix'],
         single_index_name=yaml_data['index'].get('single_index_name'),
-        folder_indexes=yaml_data['index'].get('folder_indexes')
+        folder_indexes=yaml_data['index'].get('folder_indexes'),
+        build_workers=yaml_data['index'].get('build_workers'),
+        parse_workers=yaml_data['index'].get('parse_workers'),
+        vector_store=yaml_data['index'].get('vector_store', "pinecone"),
     )
 
     client_yaml_path = Path("src/conf/protocol/client") / yaml_data['protocol']['client']
@@ -77,13 +148,27 @@ def read_configuration(yaml_file_path: Path) -> Config:
         splitters=parser_config['fields']['splitters'],
         extractors=parser_config['fields']['extractors']
     )
-    configuration = Config(index=index, client=client, parser=parser)
+    cache = CacheConfig(**yaml_data.get('cache', dict()))
+    rerank = RerankConfig(**yaml_data.get('rerank', dict()))
+    hybrid = HybridConfig(**yaml_data.get('hybrid', dict()))
+    extraction = ExtractionConfig(**yaml_data.get('extraction', dict()))
+    ingestion = IngestionConfig(**yaml_data.get('ingestion', dict()))
+    ann = AnnConfig(**yaml_data.get('ann', dict()))
+    routing = RoutingConfig(**yaml_data.get('routing', dict()))
+    configuration = Config(index=index, client=client, parser=parser, cache=cache, rerank=rerank, hybrid=hybrid, extraction=extraction, ingestion=ingestion, ann=ann, routing=routing)
 
     formatted_config = (
         f"{100*'-'}\n"
         f"Index: {vars(configuration.index)}\n"
         f"Client: {vars(configuration.client)}\n"
         f"Parser: {vars(configuration.parser)}\n"
+        f"Cache: {vars(configuration.cache)}\n"
+        f"Rerank: {vars(configuration.rerank)}\n"
+        f"Hybrid: {vars(configuration.hybrid)}\n"
+        f"Extraction: {vars(configuration.extraction)}\n"
+        f"Ingestion: {vars(configuration.ingestion)}\n"
+        f"ANN: {vars(configuration.ann)}\n"
+        f"Routing: {vars(configuration.routing)}\n"
         f"{100*'-'}\n"
     )
     formatted_config = formatted_config.replace("{", "").replace("}", "")
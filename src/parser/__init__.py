@@ -1,2 +1,2 @@
 from .extractors import transform_documents
-from .loader import load_documents
\ No newline at end of file
+from .loader import load_documents, stream_documents
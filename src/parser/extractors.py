@@ -1,8 +1,11 @@
 from typing import Optional
+from loguru import logger
 from node import Config
+from cache import DiskStore, CachedExtractor
 
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.extractors import (
+    BaseExtractor,
     SummaryExtractor,
     QuestionsAnsweredExtractor,
     TitleExtractor,
@@ -11,20 +14,34 @@ from llama_index.core.extractors import (
 from llama_index.core.ingestion import IngestionPipeline
 
 
-def get_extractors(conf: Config, llm: str) -> list:
+def get_extractors(conf: Config, llm: str, cache: Optional[DiskStore] = None, num_workers: Optional[int] = 4) -> list:
     extractors = [
         SentenceSplitter(chunk_size=1500, chunk_overlap=300),
-        QuestionsAnsweredExtractor(questions=9, llm=llm),
-        TitleExtractor(nodes=4, llm=llm),
-        SummaryExtractor(summaries=["prev", "self", "next"], llm=llm),
-        KeywordExtractor(keywords=9, llm=llm),
+        QuestionsAnsweredExtractor(questions=9, llm=llm, num_workers=num_workers),
+        TitleExtractor(nodes=4, llm=llm, num_workers=num_workers),
+        SummaryExtractor(summaries=["prev", "self", "next"], llm=llm, num_workers=num_workers),
+        KeywordExtractor(keywords=9, llm=llm, num_workers=num_workers),
     ]
+    if cache is not None:
+        extractors = [
+            CachedExtractor(extractor, store=cache) if isinstance(extractor, BaseExtractor) else extractor
+            for extractor in extractors
+        ]
     return extractors
 
-def transform_documents(documents: dict, llm: str, conf: Optional[Config] = None) -> list:
-    extractors = get_extractors(conf, llm)
+def transform_documents(documents: dict, llm: str, conf: Optional[Config] = None, cache: Optional[DiskStore] = None, num_workers: Optional[int] = 4) -> list:
+    """
+    Splits the documents into nodes and runs the metadata extractors over them.
+
+    With a `cache` the extracted metadata is replayed for nodes which were already extracted
+    with the same extractor and LLM, only new or changed nodes reach the LLM. Every extractor
+    runs up to `num_workers` LLM calls concurrently.
+    """
+    extractors = get_extractors(conf, llm, cache=cache, num_workers=num_workers)
     pipeline = IngestionPipeline(transformations=extractors)
     nodes = pipeline.run(documents=documents, show_progress=True)
+    # The pipeline validates copies of the transformations, the statistics live on those.
+    for extractor in pipeline.transformations:
+        if isinstance(extractor, CachedExtractor):
+            logger.info(f"[EXTRACTOR CACHE] {extractor.name} statistics: {extractor.stats()}")
     return nodes
-
-
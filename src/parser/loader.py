@@ -1,15 +1,25 @@
+import json
+import asyncio
+import hashlib
 from pathlib import PosixPath, Path
 from collections import defaultdict
-from typing import Optional
+from typing import Optional, List, Dict, Iterator
+from loguru import logger
 from node import Config
 from utils import methods
+from cache import DiskStore
 
 from llama_parse import LlamaParse
 from llama_index.core import SimpleDirectoryReader
 from llama_index.core import Document
+from llama_index.core.readers.base import BaseReader
 
+from .pdf import stream_pdf_documents
 
-def _read_documents_from_dir(directory: PosixPath,  recursive: Optional[bool] = True) -> list[Document]:
+LLAMA_PARSE_RESULT_TYPE = "text"  # "markdown" and "text" are available
+
+
+def _read_documents_from_dir(directory: PosixPath,  recursive: Optional[bool] = True, input_files: Optional[List[PosixPath]] = None) -> list[Document]:
     """
     Fetches and joins the documents from the specified directory.
 
@@ -22,36 +32,130 @@ def _read_documents_from_dir(directory: PosixPath,  recursive: Optional[bool] =
     """
     documents = SimpleDirectoryReader(
         input_dir=directory,
+        input_files=input_files,
         recursive=recursive,
     ).load_data()
     assert len(documents) > 0, "No documents were found in the directory."
     return documents
 
 
-def _read_documents_from_dir_using_llama_parse(directory: PosixPath, recursive: Optional[bool] = True) -> list[Document]:
+def _read_documents_from_dir_using_llama_parse(directory: PosixPath, recursive: Optional[bool] = True, input_files: Optional[List[PosixPath]] = None, cache: Optional[DiskStore] = None, parse_workers: Optional[int] = 4) -> list[Document]:
+    """
+    Parses the PDFs of the directory with LlamaParse, the remaining files with the default readers.
+
+    With a `cache` the parsed text is stored per file content and parser settings, only new or
+    changed PDFs are uploaded, at most `parse_workers` at a time.
+    """
     llama_cloud_secrets = methods.extract_llama_cloud_secrets()
     llama_cloud_api_key = llama_cloud_secrets["llama_cloud_key"]
     parser = LlamaParse(
         api_key=llama_cloud_api_key,
-        result_type="text"  # "markdown" and "text" are available
+        result_type=LLAMA_PARSE_RESULT_TYPE,
     )
-    file_extractor = {".pdf": parser}
 
-    documents = SimpleDirectoryReader(
+    reader = SimpleDirectoryReader(
         input_dir=directory,
+        input_files=input_files,
         recursive=recursive,
-        file_extractor=file_extractor
-    ).load_data()
+    )
+    if cache is not None:
+        pdf_files = [file for file in reader.input_files if file.suffix.lower() == ".pdf"]
+        parser = _CachedLlamaParse(parser, cache=cache, files=pdf_files)
+        asyncio.run(parser.aparse_missing(parse_workers))
+    reader.file_extractor = {".pdf": parser}
+
+    documents = reader.load_data()
     assert documents, "No documents were found in the directory."
     return documents
 
 
-def load_documents(source_path: str, parser_type: str) -> list[Document]:
+class _CachedLlamaParse(BaseReader):
+    """
+    Serves the LlamaParse output of unchanged PDFs from a DiskStore, keyed by the sha256 of the
+    file content and the parser result type.
+    """
+
+    def __init__(self, parser: LlamaParse, cache: DiskStore, files: List[PosixPath]) -> None:
+        self._parser = parser
+        self._cache = cache
+        self._keys = {str(file): f"llamaparse:{LLAMA_PARSE_RESULT_TYPE}:{_hash_file(file)}" for file in files}
+
+    async def aparse_missing(self, parse_workers: int) -> None:
+        """
+        Uploads the files missing from the cache, bounded to `parse_workers` concurrent uploads.
+        """
+        cached = self._cache.get_many(list(set(self._keys.values())))
+        missing = {key: file for file, key in self._keys.items() if key not in cached}
+        logger.info(f"[LLAMA PARSE] {len(self._keys) - len(missing)}/{len(self._keys)} files served from cache, parsing {len(missing)}.")
+        semaphore = asyncio.Semaphore(parse_workers)
+
+        async def parse(key: str, file: str) -> None:
+            async with semaphore:
+                documents = await self._parser.aload_data(file)
+            # Failed parses come back empty and are retried on the next run.
+            if documents:
+                self._cache.put(key, json.dumps([document.text for document in documents]).encode("utf-8"))
+
+        await asyncio.gather(*(parse(key, file) for key, file in missing.items()))
+
+    def load_data(self, file: PosixPath, extra_info: Optional[Dict] = None) -> List[Document]:
+        value = self._cache.get(self._keys.get(str(file), ""))
+        if value is None:
+            # Not uploaded ahead, or its upload failed: parse it directly without caching.
+            return self._parser.load_data(str(file), extra_info=extra_info)
+        return [Document(text=text, metadata=dict(extra_info or {})) for text in json.loads(value)]
+
+
+def _stream_documents_using_pymupdf(directory: PosixPath, recursive: Optional[bool] = True, input_files: Optional[List[PosixPath]] = None, parse_workers: Optional[int] = None) -> Iterator[Document]:
+    """
+    Streams the PDF pages parsed locally with PyMuPDF, followed by the remaining files read with the default readers.
+    """
+    input_files = SimpleDirectoryReader(
+        input_dir=directory,
+        input_files=input_files,
+        recursive=recursive,
+    ).input_files
+    pdf_files = [file for file in input_files if file.suffix.lower() == ".pdf"]
+    other_files = [file for file in input_files if file.suffix.lower() != ".pdf"]
+    logger.info(f"[PYMUPDF] Parsing {len(pdf_files)} PDFs with {parse_workers or 'all'} worker processes.")
+    yield from stream_pdf_documents(pdf_files, max_workers=parse_workers)
+    if other_files:
+        for documents in SimpleDirectoryReader(input_files=other_files).iter_data():
+            yield from documents
+
+
+def stream_documents(source_path: str, parser_type: str, input_files: Optional[List[PosixPath]] = None, cache: Optional[DiskStore] = None, parse_workers: Optional[int] = 4) -> Iterator[Document]:
+    """
+    Yields the documents of the specified directory as they are parsed.
+
+    Only the "pymupdf" parser streams page by page, the other parsers yield once everything is loaded.
+    The arguments are the same as for `load_documents`.
+    """
+    if parser_type == "pymupdf":
+        path_to_source = Path(source_path)
+        assert path_to_source.exists(), "Source directory does not exist."
+        yield from _stream_documents_using_pymupdf(path_to_source, recursive=True, input_files=input_files, parse_workers=parse_workers)
+    else:
+        yield from load_documents(source_path, parser_type=parser_type, input_files=input_files, cache=cache, parse_workers=parse_workers)
+
+
+def _hash_file(path: PosixPath, chunk_size: Optional[int] = 1 << 20) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def load_documents(source_path: str, parser_type: str, input_files: Optional[List[PosixPath]] = None, cache: Optional[DiskStore] = None, parse_workers: Optional[int] = 4) -> list[Document]:
     """
     Fetches and joins the documents from the specified directory.
 
     Args:
         directory (str): The directory path where the documents are located.
+        input_files (List[PosixPath], optional): Restricts loading to the given files. Defaults to the whole directory.
+        cache (DiskStore, optional): Caches the LlamaParse output per file content. Defaults to no cache.
+        parse_workers (int, optional): The number of concurrent LlamaParse uploads or PyMuPDF processes. Defaults to 4.
 
     Returns:
         Document: A single document containing the text of all the documents joined together.
@@ -62,9 +166,11 @@ def load_documents(source_path: str, parser_type: str) -> list[Document]:
 
     documents = None
     if parser_type == "base":
-        documents = _read_documents_from_dir(path_to_source, recursive=True)
+        documents = _read_documents_from_dir(path_to_source, recursive=True, input_files=input_files)
     elif parser_type == "llamacloud":
-        documents = _read_documents_from_dir_using_llama_parse(path_to_source, recursive=True)
+        documents = _read_documents_from_dir_using_llama_parse(path_to_source, recursive=True, input_files=input_files, cache=cache, parse_workers=parse_workers)
+    elif parser_type == "pymupdf":
+        documents = list(_stream_documents_using_pymupdf(path_to_source, recursive=True, input_files=input_files, parse_workers=parse_workers))
     else:
         raise ValueError(f"Invalid parser type: {parser_type}")
 
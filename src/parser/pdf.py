@@ -0,0 +1,66 @@
+import os
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import PosixPath
+from typing import Iterator, List, Optional, Tuple
+from loguru import logger
+
+import fitz
+from llama_index.core import Document
+from llama_index.core.readers.file.base import default_file_metadata_func
+
+# Same exclusions as SimpleDirectoryReader, only the file path reaches the embeddings and the LLM.
+EXCLUDED_METADATA_KEYS = ["file_name", "file_type", "file_size", "creation_date", "last_modified_date", "last_accessed_date"]
+
+
+def _extract_pages(file_path: str) -> List[Tuple[str, str]]:
+    """
+    Extracts the (page label, text) pairs of a PDF, runs in the worker processes.
+    """
+    pages = []
+    with fitz.open(file_path) as pdf:
+        for page in pdf:
+            text = page.get_text("text")
+            if text.strip():
+                pages.append((page.get_label() or str(page.number + 1), text))
+    return pages
+
+
+def stream_pdf_documents(files: List[PosixPath], max_workers: Optional[int] = None) -> Iterator[Document]:
+    """
+    Parses the PDFs with PyMuPDF across a process pool and yields one Document per page.
+
+    Files are yielded in the given order. At most two files per worker are in flight, so memory
+    stays bounded by the pages of those files whatever the size of the folder. A file which
+    fails to parse is logged and skipped.
+
+    Args:
+        files (List[PosixPath]): The PDF files to parse.
+        max_workers (int, optional): The number of worker processes. Defaults to the number of CPUs.
+
+    Yields:
+        Document: A page with its text, its page label and the metadata of its file.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    files = iter(files)
+    # Spawned workers do not inherit the locks held by the threads building other indexes.
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        pending = deque((file, executor.submit(_extract_pages, str(file))) for file in itertools.islice(files, 2 * max_workers))
+        while pending:
+            file, future = pending.popleft()
+            next_file = next(files, None)
+            if next_file is not None:
+                pending.append((next_file, executor.submit(_extract_pages, str(next_file))))
+            try:
+                pages = future.result()
+            except Exception as e:
+                logger.warning(f"[PYMUPDF] Failed to parse {file}: {e}")
+                continue
+            file_metadata = default_file_metadata_func(str(file))
+            for page_label, text in pages:
+                document = Document(text=text, metadata={"page_label": page_label, **file_metadata})
+                document.excluded_embed_metadata_keys.extend(EXCLUDED_METADATA_KEYS)
+                document.excluded_llm_metadata_keys.extend(EXCLUDED_METADATA_KEYS)
+                yield document
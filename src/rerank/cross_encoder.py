@@ -0,0 +1,153 @@
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, List, Optional
+from loguru import logger
+
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+
+BACKENDS = ["torch", "int8", "onnx"]
+
+
+class CrossEncoderReranker(BaseNodePostprocessor):
+    """
+    Reranks the retrieved candidates with a cross-encoder on CPU and keeps the best `top_n`.
+
+    Pairs are scored in batches, the scores are cached per (query, node content) so that repeated
+    questions do not run the model again. The "int8" backend applies dynamic
+    int8 quantization to the linear layers, the "onnx" backend runs an exported model on onnxruntime.
+    Only the node text is scored, the extractor metadata would only lengthen the sequences.
+    """
+
+    model: str = Field(description="Cross-encoder model name.")
+    top_n: int = Field(description="Number of nodes to return sorted by score.")
+    batch_size: int = Field(default=16, description="Number of pairs scored per forward pass.")
+    backend: str = Field(default="torch", description="One of 'torch', 'int8' or 'onnx'.")
+    cache_size: int = Field(default=10_000, description="Number of cached pair scores.")
+    _model: Any = PrivateAttr()
+    _scores: OrderedDict = PrivateAttr()
+    _lock: Any = PrivateAttr()
+
+    def __init__(
+        self,
+        model: str = "BAAI/bge-reranker-base",
+        top_n: int = 4,
+        batch_size: int = 16,
+        backend: str = "torch",
+        cache_size: int = 10_000,
+        max_length: int = 512,
+    ) -> None:
+        """
+        Initializes the CrossEncoderReranker object.
+
+        Args:
+            model (str, optional): The cross-encoder model name. Defaults to "BAAI/bge-reranker-base".
+            top_n (int, optional): The number of nodes kept after reranking. Defaults to 4.
+            batch_size (int, optional): The number of pairs scored per forward pass. Defaults to 16.
+            backend (str, optional): The inference backend, "torch", "int8" or "onnx". Defaults to "torch".
+            cache_size (int, optional): The number of cached pair scores. Defaults to 10 000.
+            max_length (int, optional): The maximum length of a pair in tokens. Defaults to 512.
+
+        Returns:
+            None
+        """
+        assert backend in BACKENDS, f"Invalid rerank backend: {backend}, expected one of {BACKENDS}."
+        super().__init__(model=model, top_n=top_n, batch_size=batch_size, backend=backend, cache_size=cache_size)
+        self._model = _load_model(model, backend=backend, max_length=max_length)
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        logger.info(f"[RERANK] Loaded {model} with the {backend} backend, keeping the best {top_n} nodes.")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CrossEncoderReranker"
+
+    def _postprocess_nodes(self, nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None) -> List[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Missing query bundle in extra info.")
+        if not nodes:
+            return []
+
+        with self.callback_manager.event(
+            CBEventType.RERANKING,
+            payload={
+                EventPayload.NODES: nodes,
+                EventPayload.MODEL_NAME: self.model,
+                EventPayload.QUERY_STR: query_bundle.query_str,
+                EventPayload.TOP_K: self.top_n,
+            },
+        ) as event:
+            query_digest = hashlib.sha256(query_bundle.query_str.encode("utf-8")).hexdigest()
+            keys = [(query_digest, node.node.hash) for node in nodes]
+            with self._lock:
+                scores = {key: self._scores[key] for key in keys if key in self._scores}
+                for key in scores:
+                    self._scores.move_to_end(key)
+
+            missing = [i for i, key in enumerate(keys) if key not in scores]
+            if missing:
+                pairs = [(query_bundle.query_str, nodes[i].node.get_content(metadata_mode=MetadataMode.NONE)) for i in missing]
+                predicted = self._model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+                with self._lock:
+                    for i, score in zip(missing, predicted):
+                        scores[keys[i]] = self._scores[keys[i]] = float(score)
+                    while len(self._scores) > self.cache_size:
+                        self._scores.popitem(last=False)
+            logger.debug(f"[RERANK] Scored {len(missing)}/{len(nodes)} pairs, the rest were cached.")
+
+            reranked = [NodeWithScore(node=node.node, score=scores[key]) for node, key in zip(nodes, keys)]
+            reranked.sort(key=lambda node: node.score, reverse=True)
+            reranked = reranked[:self.top_n]
+            event.on_end(payload={EventPayload.NODES: reranked})
+        return reranked
+
+
+def _load_model(model: str, backend: str, max_length: int):
+    if backend == "onnx":
+        return _OnnxCrossEncoder(model, max_length=max_length)
+
+    from sentence_transformers import CrossEncoder
+
+    cross_encoder = CrossEncoder(model, max_length=max_length, device="cpu")
+    if backend == "int8":
+        import torch
+
+        cross_encoder.model = torch.quantization.quantize_dynamic(cross_encoder.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return cross_encoder
+
+
+class _OnnxCrossEncoder:
+    """
+    Single-label cross-encoder exported to onnxruntime, scores match CrossEncoder.predict (sigmoid of the logit).
+    """
+
+    def __init__(self, model: str, max_length: int) -> None:
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+        except ImportError:
+            raise ImportError("The onnx rerank backend requires `pip install optimum[onnxruntime]`.")
+        from transformers import AutoTokenizer
+
+        self._tokenizer = AutoTokenizer.from_pretrained(model)
+        self._model = ORTModelForSequenceClassification.from_pretrained(model, export=True)
+        self._max_length = max_length
+
+    def predict(self, pairs: List[tuple], batch_size: int = 16, show_progress_bar: bool = False) -> List[float]:
+        scores = []
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            features = self._tokenizer(
+                [query for query, _ in batch],
+                [text for _, text in batch],
+                padding=True,
+                truncation="longest_first",
+                max_length=self._max_length,
+                return_tensors="np",
+            )
+            logits = np.asarray(self._model(**features).logits)[:, 0]
+            scores.extend((1.0 / (1.0 + np.exp(-logits))).tolist())
+        return scores
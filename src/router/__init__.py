@@ -0,0 +1 @@
+from .intent import IntentRouter, Intent, RouteDecision
\ No newline at end of file
@@ -0,0 +1,229 @@
+import json
+import numpy as np
+from enum import Enum
+from pathlib import Path, PosixPath
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from loguru import logger
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+
+class Intent(str, Enum):
+    GREETING = "greeting"
+    THANKS = "thanks"
+    CATALOG = "catalog"
+    TOO_SHORT = "too_short"
+    QUESTION = "question"
+
+
+INTENT_TEMPLATES: Dict[Intent, List[str]] = {
+    Intent.GREETING: [
+        "Hello",
+        "Hi there",
+        "Good morning",
+        "Hey, how are you?",
+    ],
+    Intent.THANKS: [
+        "Thank you",
+        "Thanks a lot",
+        "Thanks, that was helpful",
+        "I appreciate your help",
+    ],
+    Intent.CATALOG: [
+        "What documents do you have?",
+        "What service can you provide?",
+        "Can you list the documents currently available?",
+        "What types of service do you offer?",
+        "What documents are stored in this system?",
+        "Can you describe the services you provide?",
+        "What are the available documents in your archive?",
+        "What specific services can this system offer?",
+        "What document collections do you have?",
+        "What can you provide in terms of service?",
+        "What files do you have",
+        "List all the files",
+        "Please list all the files you have",
+        "What is your file database",
+    ],
+}
+
+# Defaults before calibration, set by hand. They are replaced by the thresholds calibrated on labelled
+# messages with `IntentRouter.calibrate` (`python eval.py --mode calibrate-router`) when those are saved.
+INTENT_THRESHOLDS: Dict[Intent, float] = {
+    Intent.GREETING: 0.85,
+    Intent.THANKS: 0.85,
+    Intent.CATALOG: 0.80,
+}
+
+GREETINGS = ["hello", "hi", "greetings", "hey"]
+
+
+@dataclass
+class RouteDecision:
+    intent: Intent
+    score: float = 0.0
+    template: Optional[str] = None
+
+
+class IntentRouter:
+    """
+    Routes user messages to an intent before any retrieval happens.
+
+    Short greetings, thanks and too short messages are recognised with string rules, everything else
+    is embedded once and compared against a matrix of normalized template embeddings. The embedding
+    model can be a cheap local model, independent of the one used for retrieval.
+    """
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        templates: Optional[Dict[Intent, List[str]]] = None,
+        thresholds: Optional[Dict[Intent, float]] = None,
+        min_question_length: Optional[int] = 10,
+    ) -> None:
+        """
+        Initializes the IntentRouter object.
+
+        Args:
+            embed_model (BaseEmbedding): The model used to embed templates and messages.
+            templates (Dict[Intent, List[str]], optional): Example messages per intent. Defaults to INTENT_TEMPLATES.
+            thresholds (Dict[Intent, float], optional): Minimum cosine similarity per intent. Defaults to INTENT_THRESHOLDS.
+            min_question_length (int, optional): Messages shorter than this are too short to be answered. Defaults to 10.
+
+        Returns:
+            None
+        """
+        self._embed_model = embed_model
+        self._templates = templates or INTENT_TEMPLATES
+        self._thresholds = dict(thresholds or INTENT_THRESHOLDS)
+        self._min_question_length = min_question_length
+
+        self._template_texts: List[str] = []
+        self._template_intents: List[Intent] = []
+        self._template_matrix: Optional[np.ndarray] = None
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    def fit(self) -> 'IntentRouter':
+        """
+        Embeds the templates and keeps them as a row-normalized matrix.
+
+        Returns:
+            IntentRouter: The fitted router.
+        """
+        self._template_texts = [text for texts in self._templates.values() for text in texts]
+        self._template_intents = [intent for intent, texts in self._templates.items() for _ in texts]
+        embeddings = [self._embed_model.get_query_embedding(text) for text in self._template_texts]
+        self._template_matrix = _normalize(np.asarray(embeddings, dtype=np.float32))
+        logger.info(f"[ROUTER] Fitted router with {len(self._template_texts)} templates for {len(self._templates)} intents.")
+        return self
+
+    @property
+    def thresholds(self) -> Dict[Intent, float]:
+        return dict(self._thresholds)
+
+    def calibrate(self, messages: List[str], labels: List[Intent]) -> Dict[Intent, float]:
+        """
+        Calibrates the threshold of every templated intent on labelled messages.
+
+        A message is routed to an intent when its nearest template belongs to the intent and the similarity
+        reaches the threshold. Per intent, the threshold maximizing the F1 score over the labelled messages is
+        kept, ties are broken towards the higher threshold so that fewer questions miss the retrieval.
+        Intents without a labelled message keep their threshold.
+
+        Args:
+            messages (List[str]): The labelled messages, they should not be copies of the templates.
+            labels (List[Intent]): The expected intent of each message, Intent.QUESTION for in-domain questions.
+
+        Returns:
+            Dict[Intent, float]: The thresholds of the router after calibration.
+        """
+        assert self._template_matrix is not None, "Router is not fitted."
+        assert messages and len(messages) == len(labels), "Every message needs exactly one label."
+        # Computed as in `route_embedding`, the thresholds have to compare equal to the routed similarities.
+        similarities = np.stack([
+            self._template_matrix @ _normalize(np.asarray(self._embed_model.get_query_embedding(message), dtype=np.float32))
+            for message in messages
+        ])
+        nearest = np.argmax(similarities, axis=1)
+        scores = similarities[np.arange(len(messages)), nearest]
+
+        for intent in self._templates.keys():
+            labelled = np.array([label == intent for label in labels], dtype=bool)
+            nearest_intent = np.array([self._template_intents[index] == intent for index in nearest], dtype=bool)
+            positives = int(np.sum(labelled))
+            if not positives:
+                logger.warning(f"[ROUTER] No labelled {intent.value} messages, keeping the threshold {self._thresholds.get(intent, 1.0)}.")
+                continue
+            best_threshold, best_f1 = self._thresholds.get(intent, 1.0), -1.0
+            for threshold in sorted(scores[nearest_intent].tolist(), reverse=True):
+                routed = nearest_intent & (scores >= threshold)
+                true_positives = int(np.sum(routed & labelled))
+                false_positives = int(np.sum(routed & ~labelled))
+                f1 = 2 * true_positives / (2 * true_positives + false_positives + positives - true_positives)
+                if f1 > best_f1:
+                    best_threshold, best_f1 = float(threshold), f1
+            logger.info(f"[ROUTER] Calibrated {intent.value} threshold {best_threshold:.3f} with F1 {max(best_f1, 0.0):.3f} on {len(messages)} messages.")
+            self._thresholds[intent] = best_threshold
+        return self.thresholds
+
+    def load_thresholds(self, path: PosixPath) -> bool:
+        """
+        Replaces the thresholds with the calibrated ones saved at the path, False if there are none.
+        """
+        if not Path(path).exists():
+            return False
+        with open(path, 'r') as file:
+            self._thresholds.update({Intent(intent): float(threshold) for intent, threshold in json.load(file).items()})
+        return True
+
+    def save_thresholds(self, path: PosixPath) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump({intent.value: threshold for intent, threshold in self._thresholds.items()}, file, indent=2)
+
+    def route(self, message: str) -> RouteDecision:
+        decision = self.route_by_rules(message)
+        if decision is not None:
+            return decision
+        return self.route_embedding(message, self._embed_model.get_query_embedding(message))
+
+    async def aroute(self, message: str) -> RouteDecision:
+        decision = self.route_by_rules(message)
+        if decision is not None:
+            return decision
+        return self.route_embedding(message, await self._embed_model.aget_query_embedding(message))
+
+    def route_embedding(self, message: str, embedding: List[float]) -> RouteDecision:
+        """
+        Routes a message whose embedding was already computed by the router's embedding model.
+        """
+        assert self._template_matrix is not None, "Router is not fitted."
+        similarities = self._template_matrix @ _normalize(np.asarray(embedding, dtype=np.float32))
+        best = int(np.argmax(similarities))
+        intent, score = self._template_intents[best], float(similarities[best])
+        logger.info(f"[ROUTER] Nearest template '{self._template_texts[best]}' ({intent.value}) with similarity {score:.3f}")
+        if score >= self._thresholds.get(intent, 1.0):
+            return RouteDecision(intent=intent, score=score, template=self._template_texts[best])
+        if len(message) < self._min_question_length:
+            return RouteDecision(intent=Intent.TOO_SHORT, score=score)
+        return RouteDecision(intent=Intent.QUESTION, score=score)
+
+    def route_by_rules(self, message: str) -> Optional[RouteDecision]:
+        """
+        Routes greetings and thanks without embedding the message, None for any other message.
+        """
+        lowered = message.lower()
+        if any(greeting in lowered for greeting in GREETINGS) and len(message) < 10:
+            return RouteDecision(intent=Intent.GREETING, score=1.0)
+        if "thank" in lowered and len(message) < 20:
+            return RouteDecision(intent=Intent.THANKS, score=1.0)
+        return None
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
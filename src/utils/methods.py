@@ -220,6 +220,27 @@ def highlight_search_terms(
     return pdf_document, output_path
 
 
+def fetch_source_references(source_nodes: list) -> list:
+    """
+    Fetches the source metadata of the retrieved nodes, one entry per node in retrieval order.
+
+    Args:
+        source_nodes (list): The source nodes (NodeWithScore) of a response.
+
+    Returns:
+        list: Dictionaries with the file name, file path, page label and score of every node.
+    """
+    return [
+        {
+            "file_name": n.metadata.get("file_name"),
+            "file_path": n.metadata.get("file_path"),
+            "page_label": n.metadata.get("page_label"),
+            "score": n.score,
+        }
+        for n in source_nodes
+    ]
+
+
 def fetch_response_results(response: dict, preprocess: bool) -> dict:
     """
     Fetches the relevant information from the response object and returns it as a dictionary.
@@ -233,15 +254,16 @@ def fetch_response_results(response: dict, preprocess: bool) -> dict:
     """
     text = response.response
     source_nodes = response.source_nodes
+    source_references = fetch_source_references(source_nodes)
     pages = [
-        n.metadata.get("page_label")
-        for n in source_nodes
-        if n.metadata.get("page_label") is not None
+        reference["page_label"]
+        for reference in source_references
+        if reference["page_label"] is not None
     ]
     file_paths = [
-        n.metadata.get("file_path")
-        for n in source_nodes
-        if n.metadata.get("file_path") is not None
+        reference["file_path"]
+        for reference in source_references
+        if reference["file_path"] is not None
     ]
 
     references = [n.text for n in source_nodes]
@@ -252,4 +274,4 @@ def fetch_response_results(response: dict, preprocess: bool) -> dict:
         "file_paths": file_paths,
         "references": references,
     }
-    return response_info
\ No newline at end of file
+    return response_info
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The modules of the agent import each other from the source root, as the apps run them.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
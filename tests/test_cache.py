@@ -0,0 +1,78 @@
+import itertools
+import types
+
+import pytest
+
+from cache import AnswerCache, DiskStore
+from cache import answer, store
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """ Strictly increasing timestamps, entries written in a row are never accessed at the same time. """
+    ticks = itertools.count(1)
+    monkeypatch.setattr(store, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_disk_store_round_trip(tmp_path):
+    disk_store = DiskStore(tmp_path / "store.sqlite")
+    disk_store.put_many([("a", b"1"), ("b", b"2")])
+
+    assert disk_store.get_many(["a", "b", "c"]) == {"a": b"1", "b": b"2"}
+    assert disk_store.stats()["hits"] == 2 and disk_store.stats()["misses"] == 1
+
+    disk_store.delete_many(["a"])
+    assert disk_store.get("a") is None
+    assert len(DiskStore(tmp_path / "store.sqlite")) == 1
+
+
+def test_disk_store_evicts_least_recently_used(tmp_path, clock):
+    disk_store = DiskStore(tmp_path / "store.sqlite", max_entries=10)
+    for i in range(10):
+        disk_store.put(f"key-{i}", b"value")
+    # Reading the oldest entries makes them the most recently used.
+    disk_store.get_many(["key-0", "key-1"])
+    disk_store.put("key-10", b"value")
+
+    # Eviction goes down to 90% of the bound.
+    assert len(disk_store) == 9
+    kept = disk_store.get_many([f"key-{i}" for i in range(11)])
+    assert sorted(kept) == sorted(["key-0", "key-1", "key-10"] + [f"key-{i}" for i in range(4, 10)])
+
+
+def test_answer_cache_exact_and_semantic_hits():
+    cache = AnswerCache(embed_model=None, similarity_threshold=0.95)
+    cache.store("index", "What is the deadline?", "In May.", [], embedding=[1.0, 0.0, 0.0])
+
+    exact = cache.lookup("index", "what is the  deadline", embedding=[0.0, 1.0, 0.0])
+    assert exact is not None and exact.text == "In May."
+
+    semantic = cache.lookup("index", "When is the deadline?", embedding=[0.99, 0.1, 0.0])
+    assert semantic is not None and semantic.text == "In May."
+    assert semantic.similarity == pytest.approx(0.995, abs=1e-3)
+
+    assert cache.lookup("index", "Who signed the contract?", embedding=[0.0, 1.0, 0.0]) is None
+    assert cache.lookup("other-index", "What is the deadline?", embedding=[1.0, 0.0, 0.0]) is None
+    assert cache.stats()["exact_hits"] == 1 and cache.stats()["semantic_hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_answer_cache_expires_answers_after_ttl(monkeypatch):
+    cache = AnswerCache(embed_model=None, ttl=60)
+    cache.store("index", "What is the deadline?", "In May.", [], embedding=[1.0, 0.0])
+    assert cache.lookup("index", "What is the deadline?", embedding=[1.0, 0.0]) is not None
+
+    now = answer.time.time()
+    monkeypatch.setattr(answer, "time", types.SimpleNamespace(time=lambda: now + 61))
+    assert cache.lookup("index", "What is the deadline?", embedding=[1.0, 0.0]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_answer_cache_evicts_least_recently_used_answers():
+    cache = AnswerCache(embed_model=None, max_entries=2)
+    cache.store("index", "first", "1", [], embedding=[1.0, 0.0, 0.0])
+    cache.store("index", "second", "2", [], embedding=[0.0, 1.0, 0.0])
+    cache.lookup("index", "first", embedding=[1.0, 0.0, 0.0])
+    cache.store("index", "third", "3", [], embedding=[0.0, 0.0, 1.0])
+
+    assert cache.lookup("index", "second", embedding=[0.0, 1.0, 0.0]) is None
+    assert cache.lookup("index", "first", embedding=[1.0, 0.0, 0.0]).text == "1"
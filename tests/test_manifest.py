@@ -0,0 +1,55 @@
+import json
+
+from hub.manifest import IndexManifest
+
+
+def test_journal_is_replayed_into_an_incomplete_manifest(tmp_path):
+    folder = tmp_path / "source"
+    folder.mkdir()
+    (folder / "a.pdf").write_bytes(b"a")
+    (folder / "b.pdf").write_bytes(b"b")
+    manifest_path = tmp_path / "index.manifest.json"
+
+    manifest = IndexManifest.load(manifest_path, folder)
+    hashes = manifest.scan()
+    manifest.record_file("a.pdf", hashes["a.pdf"], node_ids=["a-1"])
+    manifest.mark_complete()
+    manifest.save()
+    # Nodes journaled ahead of upserts which were interrupted before the next save.
+    manifest.journal_nodes({"a.pdf": ["a-1", "a-2"], "b.pdf": ["b-1"]})
+    manifest.journal_nodes({"b.pdf": ["b-2"]})
+    with open(manifest_path.with_suffix(".journal"), "a") as file:
+        file.write('{"b.pdf": ["b-3"')
+
+    replayed = IndexManifest.load(manifest_path, folder)
+
+    assert not replayed.complete
+    assert replayed.node_ids("a.pdf") == ["a-1", "a-2"]
+    assert replayed.node_ids("b.pdf") == ["b-1", "b-2"]
+    # Journaled files are partial and are indexed again.
+    assert sorted(replayed.diff(hashes).changed) == ["a.pdf", "b.pdf"]
+
+    replayed.save()
+    assert not manifest_path.with_suffix(".journal").exists()
+    with open(manifest_path) as file:
+        assert json.load(file)["files"]["b.pdf"] == {"sha256": None, "node_ids": ["b-1", "b-2"]}
+
+
+def test_diff_of_a_complete_manifest(tmp_path):
+    folder = tmp_path / "source"
+    folder.mkdir()
+    (folder / "kept.pdf").write_bytes(b"kept")
+    (folder / "changed.pdf").write_bytes(b"old")
+    manifest = IndexManifest.load(tmp_path / "index.manifest.json", folder)
+    for relative_path, sha256 in manifest.scan().items():
+        manifest.record_file(relative_path, sha256, node_ids=[relative_path])
+    manifest.record_file("deleted.pdf", "0" * 64, node_ids=["deleted.pdf"])
+
+    (folder / "changed.pdf").write_bytes(b"new")
+    (folder / "added.pdf").write_bytes(b"added")
+    (folder / ".hidden").write_bytes(b"hidden")
+    diff = manifest.diff(manifest.scan())
+
+    assert diff.added == ["added.pdf"]
+    assert diff.changed == ["changed.pdf"]
+    assert diff.deleted == ["deleted.pdf"]
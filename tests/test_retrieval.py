@@ -0,0 +1,93 @@
+import pytest
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from hub.engine import RetrievalGate
+from hub.sparse import SparseIndex, tokenize
+
+
+def _nodes(scores):
+    return [NodeWithScore(node=TextNode(text=str(score)), score=score) for score in scores]
+
+
+def test_gate_is_calibrated_on_the_lowest_similarities():
+    gate = RetrievalGate.calibrate([0.9, 0.5, 0.7, 0.8, 0.6, 0.85, 0.75, 0.65, 0.95, 0.55], higher_is_better=True, quantile=0.1)
+
+    assert gate.threshold == 0.55
+    assert gate.samples == 10
+    assert gate.passes(_nodes([0.3, 0.6]))
+    assert not gate.passes(_nodes([0.3, 0.5]))
+    assert not gate.passes([])
+
+
+def test_gate_is_calibrated_on_the_highest_distances():
+    gate = RetrievalGate.calibrate([0.2, 1.0, 0.4, 0.6, 0.8], higher_is_better=False, quantile=0.2)
+
+    assert gate.threshold == 0.8
+    assert gate.passes(_nodes([1.5, 0.7]))
+    assert not gate.passes(_nodes([0.9]))
+
+
+def test_gate_round_trip(tmp_path):
+    path = tmp_path / "eval" / "retrieval_gate.json"
+    assert RetrievalGate.load(path) is None
+
+    gate = RetrievalGate.calibrate([0.5, 0.6], higher_is_better=True, quantile=0.0)
+    gate.save(path)
+    assert RetrievalGate.load(path) == gate
+
+
+@pytest.fixture
+def sparse_nodes():
+    return [
+        TextNode(text="Termin realizacji umowy wynosi 12 miesięcy, zgodnie z punktem 4.2.1.", id_="deadline", embedding=[0.1, 0.2]),
+        TextNode(text="Wynagrodzenie wykonawcy jest płatne w ratach.", id_="payment", embedding=[0.3, 0.4]),
+        TextNode(text="Spory rozstrzyga sąd właściwy dla siedziby zamawiającego.", id_="disputes", embedding=[0.5, 0.6],
+                 metadata={"excerpt_keywords": "prawo właściwe, umowa"}),
+    ]
+
+
+def test_tokenize_keeps_clause_numbers():
+    assert tokenize("Zgodnie z punktem 4.2.1 Umowy") == ["zgodnie", "z", "punktem", "4.2.1", "umowy"]
+
+
+def test_sparse_index_search(tmp_path, sparse_nodes):
+    sparse_index = SparseIndex(tmp_path / "index.sparse.npz")
+    sparse_index.add_nodes(sparse_nodes)
+
+    hits = sparse_index.search("termin 4.2.1", top_k=5)
+    assert [hit.node.node_id for hit in hits] == ["deadline"]
+    # Keywords are indexed with the text.
+    assert [hit.node.node_id for hit in sparse_index.search("prawo umowa", top_k=5)][0] == "disputes"
+    assert sparse_index.search("nieznane słowo") == []
+    # Nodes are stored without their embeddings.
+    assert hits[0].node.embedding is None
+    assert sparse_nodes[0].embedding is not None
+
+
+def test_sparse_index_replaces_and_deletes_nodes(tmp_path, sparse_nodes):
+    sparse_index = SparseIndex(tmp_path / "index.sparse.npz")
+    sparse_index.add_nodes(sparse_nodes)
+    sparse_index.add_nodes([TextNode(text="Wynagrodzenie jest płatne jednorazowo.", id_="payment")])
+    sparse_index.delete_nodes(["deadline"])
+
+    assert len(sparse_index) == 2
+    assert sparse_index.search("termin") == []
+    hits = sparse_index.search("wynagrodzenie płatne")
+    assert [hit.node.node_id for hit in hits] == ["payment"]
+    assert "jednorazowo" in hits[0].node.get_content()
+
+
+def test_sparse_index_is_compacted_on_save(tmp_path, sparse_nodes):
+    path = tmp_path / "index.sparse.npz"
+    sparse_index = SparseIndex(path)
+    assert not sparse_index.exists
+    sparse_index.add_nodes(sparse_nodes)
+    sparse_index.delete_nodes(["payment"])
+    expected = [(hit.node.node_id, hit.score) for hit in sparse_index.search("umowy umowa termin sąd", top_k=5)]
+    sparse_index.save()
+
+    loaded = SparseIndex.load(path)
+    assert loaded.exists
+    assert len(loaded) == 2
+    assert "wynagrodzenie" not in loaded._term_ids
+    assert [(hit.node.node_id, pytest.approx(hit.score)) for hit in loaded.search("umowy umowa termin sąd", top_k=5)] == expected
@@ -0,0 +1,59 @@
+import numpy as np
+from llama_index.core.embeddings import MockEmbedding
+
+from router import Intent, IntentRouter
+
+
+class KeywordEmbedding(MockEmbedding):
+    """ Bag of words over a tiny vocabulary, similar messages share words. """
+
+    vocabulary = ["documents", "files", "list", "have", "hello", "thanks", "deadline", "contract", "penalty"]
+
+    def _get_query_embedding(self, query):
+        words = query.lower().replace("?", "").split()
+        return (np.array([float(word in words) for word in self.vocabulary]) + 1e-3).tolist()
+
+    def _get_text_embedding(self, text):
+        return self._get_query_embedding(text)
+
+
+TEMPLATES = {
+    Intent.GREETING: ["hello"],
+    Intent.CATALOG: ["what documents do you have", "list the files"],
+}
+
+
+def test_router_routes_to_the_nearest_template_above_its_threshold():
+    router = IntentRouter(KeywordEmbedding(embed_dim=9), templates=TEMPLATES, thresholds={Intent.CATALOG: 0.8}).fit()
+
+    assert router.route("Which documents do you have?").intent == Intent.CATALOG
+    assert router.route("What is the deadline of the contract?").intent == Intent.QUESTION
+    assert router.route("deadline").intent == Intent.TOO_SHORT
+    assert router.route("hi").intent == Intent.GREETING
+
+
+def test_router_thresholds_are_calibrated_on_labelled_messages(tmp_path):
+    router = IntentRouter(KeywordEmbedding(embed_dim=9), templates=TEMPLATES, thresholds={Intent.CATALOG: 0.99}).fit()
+    messages = [
+        "documents you have",
+        "list files you have",
+        "list all files",
+        "what is the penalty in the contract",
+        "what is the deadline for the documents",
+    ]
+    labels = [Intent.CATALOG, Intent.CATALOG, Intent.CATALOG, Intent.QUESTION, Intent.QUESTION]
+    thresholds = router.calibrate(messages, labels)
+
+    # Every catalog message is routed, the question sharing words with a template is not.
+    catalog_scores = [router.route(message).score for message in messages[:3]]
+    assert thresholds[Intent.CATALOG] == min(catalog_scores)
+    assert [router.route(message).intent for message in messages] == labels
+    # Intents without labelled messages keep their threshold.
+    assert Intent.GREETING not in thresholds
+
+    path = tmp_path / "intent_thresholds.json"
+    router.save_thresholds(path)
+    reloaded = IntentRouter(KeywordEmbedding(embed_dim=9), templates=TEMPLATES).fit()
+    assert reloaded.load_thresholds(path)
+    assert reloaded.thresholds[Intent.CATALOG] == thresholds[Intent.CATALOG]
+    assert not reloaded.load_thresholds(tmp_path / "missing.json")
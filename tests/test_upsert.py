@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from client import upsert
+from client.upsert import bulk_upsert
+
+
+class StatusError(Exception):
+    def __init__(self, status: int) -> None:
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class FakeIndex:
+    """ Stand-in of a Pinecone index failing the first requests of every batch with the given errors. """
+
+    def __init__(self, errors_per_batch=()) -> None:
+        self.errors_per_batch = list(errors_per_batch)
+        self.attempts = {}
+        self.upserted = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace=None):
+        key = vectors[0]["id"]
+        with self._lock:
+            attempt = self.attempts.get(key, 0)
+            self.attempts[key] = attempt + 1
+        if attempt < len(self.errors_per_batch):
+            raise self.errors_per_batch[attempt]
+        with self._lock:
+            for vector in vectors:
+                self.upserted[vector["id"]] = (vector, namespace)
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(upsert.time, "sleep", recorded.append)
+    return recorded
+
+
+def _vectors(count):
+    return [{"id": f"node-{i}", "values": [float(i), 1.0], "metadata": {}} for i in range(count)]
+
+
+def test_throttled_requests_are_retried_until_they_succeed(delays):
+    index = FakeIndex([StatusError(429), StatusError(503)])
+    stats = bulk_upsert(index, _vectors(25), namespace="tenant", batch_size=10, max_workers=4, backoff_seconds=0.01)
+
+    assert sorted(index.upserted) == sorted(f"node-{i}" for i in range(25))
+    assert all(namespace == "tenant" for _, namespace in index.upserted.values())
+    assert stats["requests"] == 3
+    assert stats["retries"] == 6
+    assert all(attempts == 3 for attempts in index.attempts.values())
+    assert len(delays) == 6
+
+
+def test_backoff_doubles_with_jitter(delays):
+    index = FakeIndex([ConnectionError(), TimeoutError(), StatusError(500)])
+    bulk_upsert(index, _vectors(5), batch_size=10, backoff_seconds=0.01)
+
+    assert len(delays) == 3
+    for attempt, delay in enumerate(delays):
+        assert 0.5 * 0.01 * 2 ** attempt <= delay < 1.5 * 0.01 * 2 ** attempt
+
+
+def test_non_retryable_error_is_raised_immediately(delays):
+    index = FakeIndex([StatusError(400)])
+    with pytest.raises(StatusError):
+        bulk_upsert(index, _vectors(5), batch_size=10, backoff_seconds=0.01)
+
+    assert index.attempts == {"node-0": 1}
+    assert delays == []
+
+
+def test_last_error_is_raised_once_the_retries_are_exhausted(delays):
+    index = FakeIndex([StatusError(429)] * 10)
+    with pytest.raises(StatusError):
+        bulk_upsert(index, _vectors(20), batch_size=10, max_workers=2, max_retries=2, backoff_seconds=0.01)
+
+    assert all(attempts == 3 for attempts in index.attempts.values())
+    assert index.upserted == {}
@@ -0,0 +1,161 @@
+import io
+
+import numpy as np
+import pytest
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+)
+
+pytest.importorskip("faiss", reason="The local vector stores need the 'local' extra.")
+
+from client.vendor.ann import AnnVectorStore  # noqa: E402
+from client.vendor.faiss import FaissClient  # noqa: E402
+from client.vendor.filters import FilterColumns  # noqa: E402
+
+
+def _filters(*filters, condition=FilterCondition.AND):
+    return MetadataFilters(filters=list(filters), condition=condition)
+
+
+@pytest.fixture
+def columns():
+    columns = FilterColumns()
+    columns.set_rows([0, 1, 2], [
+        {"folder": "contracts", "tenant": "commercial"},
+        {"folder": "policies", "tenant": "medical"},
+        {"folder": "contracts"},
+    ])
+    # Rows are set by position, gaps stay without metadata.
+    columns.set_rows([4], [{"folder": "policies", "tenant": "commercial"}])
+    return columns
+
+
+def test_filter_columns_operators(columns):
+    assert columns.mask(_filters(MetadataFilter(key="folder", value="contracts")), 5).tolist() == [True, False, True, False, False]
+    assert columns.mask(_filters(MetadataFilter(key="tenant", value=["medical", "commercial"], operator=FilterOperator.IN)), 5).tolist() == [True, True, False, False, True]
+    assert columns.mask(_filters(MetadataFilter(key="tenant", value="commercial", operator=FilterOperator.NE)), 5).tolist() == [False, True, True, True, False]
+    assert columns.mask(_filters(MetadataFilter(key="tenant", value=["medical"], operator=FilterOperator.NIN)), 5).tolist() == [True, False, True, True, True]
+    assert columns.mask(_filters(MetadataFilter(key="folder", value="unknown")), 5).tolist() == [False] * 5
+    assert columns.mask(_filters(), 3).tolist() == [True] * 3
+
+
+def test_filter_columns_conditions(columns):
+    either = _filters(
+        MetadataFilter(key="folder", value="contracts"),
+        MetadataFilter(key="tenant", value="medical"),
+        condition=FilterCondition.OR,
+    )
+    assert columns.mask(either, 5).tolist() == [True, True, True, False, False]
+    nested = _filters(either, MetadataFilter(key="tenant", value="commercial", operator=FilterOperator.NE))
+    assert columns.mask(nested, 5).tolist() == [False, True, True, False, False]
+
+
+def test_filter_columns_reject_unknown_keys_and_operators(columns):
+    with pytest.raises(ValueError):
+        columns.mask(_filters(MetadataFilter(key="author", value="x")), 5)
+    with pytest.raises(NotImplementedError):
+        columns.mask(_filters(MetadataFilter(key="page_label", value=3, operator=FilterOperator.GT)), 5)
+
+
+def test_filter_columns_round_trip(columns):
+    file = io.BytesIO()
+    columns.save(file, 5)
+    file.seek(0)
+    # Rows beyond the committed size are dropped.
+    loaded = FilterColumns.load(file, 4)
+
+    assert loaded.mask(_filters(MetadataFilter(key="folder", value="contracts")), 4).tolist() == [True, False, True, False]
+    loaded.set_rows([4], [{"folder": "archive"}])
+    assert loaded.mask(_filters(MetadataFilter(key="folder", value="archive")), 5).tolist() == [False] * 4 + [True]
+
+
+def _clustered_nodes(count, dim, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(clusters, size=count)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(count, dim))
+    nodes = [
+        TextNode(text=f"node {i}", id_=f"node-{i}", embedding=vector.tolist(), metadata={"folder": f"folder-{label % 2}"})
+        for i, (vector, label) in enumerate(zip(vectors, labels))
+    ]
+    return nodes, centers
+
+
+def test_faiss_client_upserts_deletes_and_persists(tmp_path):
+    nodes, _ = _clustered_nodes(count=200, dim=16, clusters=4)
+    client = FaissClient(tmp_path / "faiss")
+    client.connect()
+    assert not client.index_exists("index")
+
+    client.create_new_vstore("index", dim=16)
+    client.upsert_nodes("index", nodes)
+    # Upserting a node again replaces it.
+    client.upsert_nodes("index", nodes[:10])
+    vector_store = client.get_existing_vstore("index")
+    assert len(vector_store) == 200
+
+    result = vector_store.query(VectorStoreQuery(query_embedding=nodes[0].embedding, similarity_top_k=3))
+    assert result.ids[0] == "node-0"
+    assert result.similarities[0] == pytest.approx(1.0, abs=1e-5)
+    assert result.nodes[0].get_content() == "node 0"
+
+    client.delete_vectors("index", ["node-0"])
+    client.persist("index")
+
+    reopened = FaissClient(tmp_path / "faiss")
+    assert reopened.list_existing_indexes() == ["index"]
+    reopened_store = reopened.get_existing_vstore("index")
+    assert len(reopened_store) == 199
+    assert "node-0" not in reopened_store.query(VectorStoreQuery(query_embedding=nodes[0].embedding, similarity_top_k=3)).ids
+
+
+@pytest.mark.parametrize("codec", ["pq", "int8"])
+def test_ann_recall_against_exact_search(tmp_path, codec):
+    nodes, centers = _clustered_nodes(count=2000, dim=32, clusters=20)
+    store = AnnVectorStore(tmp_path / codec, dim=32, codec=codec, nlist=16, nprobe=4, pq_subvectors=8, rescore_k=64, train_size=256)
+    store.add(nodes)
+
+    rng = np.random.default_rng(1)
+    queries = (centers[rng.integers(len(centers), size=50)] + 0.3 * rng.normal(size=(50, 32))).tolist()
+    assert store.recall(queries, top_k=5) >= 0.9
+
+
+def test_ann_memory_stats_count_the_bookkeeping(tmp_path):
+    nodes, _ = _clustered_nodes(count=600, dim=32, clusters=8)
+    store = AnnVectorStore(tmp_path / "store", dim=32, codec="pq", nlist=8, pq_subvectors=8, train_size=256)
+    store.add(nodes)
+    stats = store.memory_stats()
+
+    assert stats["trained"]
+    assert stats["code_bytes_per_vector"] == 8 + 4 + 1 + 8
+    # At least the id string and the filter columns of every vector.
+    assert stats["bookkeeping_bytes_per_vector"] > 49 + 5 * 4
+    assert stats["bytes_per_vector"] == stats["code_bytes_per_vector"] + stats["bookkeeping_bytes_per_vector"]
+    assert stats["compression"] == pytest.approx((32 * 4 + stats["bookkeeping_bytes_per_vector"]) / stats["bytes_per_vector"])
+
+
+def test_ann_query_with_filters_deletes_and_persistence(tmp_path):
+    nodes, _ = _clustered_nodes(count=600, dim=32, clusters=8)
+    store = AnnVectorStore(tmp_path / "store", dim=32, codec="int8", nlist=8, nprobe=2, train_size=256)
+    store.add(nodes)
+    query_embedding = nodes[0].embedding
+
+    result = store.query(VectorStoreQuery(query_embedding=query_embedding, similarity_top_k=3))
+    assert result.ids[0] == "node-0"
+    store.delete_nodes(["node-0"])
+    assert "node-0" not in store.query(VectorStoreQuery(query_embedding=query_embedding, similarity_top_k=3)).ids
+
+    filters = _filters(MetadataFilter(key="folder", value="folder-1"))
+    filtered = store.query(VectorStoreQuery(query_embedding=query_embedding, similarity_top_k=10, filters=filters))
+    assert len(filtered.ids) == 10
+    assert all(node.metadata["folder"] == "folder-1" for node in filtered.nodes)
+    store.persist()
+
+    reopened = AnnVectorStore(tmp_path / "store", codec="int8", nlist=8, nprobe=2, train_size=256)
+    assert len(reopened) == 599
+    assert reopened.query(VectorStoreQuery(query_embedding=query_embedding, similarity_top_k=10, filters=filters)).ids == filtered.ids